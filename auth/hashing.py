@@ -1,7 +1,59 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
 from bcrypt import hashpw, gensalt, checkpw
+from db.metrics import hashing_pending, request_stats
+
+# Procesos dedicados a bcrypt. Cada hash cuesta 100-250 ms de CPU, así que se
+# ejecutan fuera del proceso que atiende las peticiones.
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", os.cpu_count() or 1))
+# Operaciones en cola o en curso permitidas antes de responder 503 de inmediato.
+HASHING_MAX_PENDING = int(os.getenv("HASHING_MAX_PENDING", HASHING_WORKERS * 4))
+
+_executor = None
+# Sólo se modifica desde el bucle de eventos, por lo que no necesita lock.
+_pending = 0
 
 def hash_password(password: str) -> str:
     return hashpw(password.encode('utf-8'), gensalt()).decode('utf-8')
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def get_hashing_executor():
+    global _executor
+    if _executor is None:
+        # spawn: hacer fork de un proceso con bucle de eventos e hilos no es seguro.
+        _executor = ProcessPoolExecutor(max_workers = HASHING_WORKERS, mp_context = multiprocessing.get_context("spawn"))
+    return _executor
+
+def shutdown_hashing_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait = True, cancel_futures = True)
+        _executor = None
+
+async def _run_in_hashing_pool(func, *args):
+    global _pending
+    if _pending >= HASHING_MAX_PENDING:
+        raise HTTPException(status_code = 503, detail = "Too many pending password operations.", headers = {"Retry-After": "1"})
+    _pending += 1
+    hashing_pending.set(_pending)
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_hashing_executor(), func, *args)
+    finally:
+        _pending -= 1
+        hashing_pending.set(_pending)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.hashing_seconds += time.perf_counter() - started
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hashing_pool(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hashing_pool(verify_password, plain_password, hashed_password)
@@ -1,7 +1,13 @@
 import os
-import redis
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
+from db.redis import get_async_redis
+from auth.revocation import REVOKED_KEY_PREFIX, REVOCATION_CHANNEL, revocation_filter
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 REFRESH_SECRET_KEY = os.getenv("REFRESH_SECRET_KEY", "your_refresh_secret_key")
@@ -13,26 +19,49 @@ ACCESS_TOKEN_EXPIRE_MINUTES_DICT = {
   "reset": 15,
 }
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+# Caché LRU de tokens de acceso ya verificados, por proceso.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+# Una entrada vive como mucho hasta el "exp" del token o este número de segundos, lo
+# que llegue antes. Las revocaciones llegan por pub/sub; esto es sólo una red de seguridad.
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", 30))
 
-# Archivo para almacenar tokens revocados.
-REVOKED_TOKENS_FILE = "revoked_tokens.txt"
+# digest del token -> (payload, instante en que caduca la entrada).
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
 
-# Cargar tokens revocados desde el archivo.
-revoked_tokens = set()
-if os.path.exists(REVOKED_TOKENS_FILE):
-    with open(REVOKED_TOKENS_FILE, "r") as file:
-        revoked_tokens = set(line.strip() for line in file)
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
 
-# Conexión a Redis.
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
-redis_client = redis.StrictRedis(host = REDIS_HOST, port = REDIS_PORT, decode_responses = True)
+def _get_cached_payload(digest: bytes):
+    with _token_cache_lock:
+        entry = _token_cache.get(digest)
+        if entry is None:
+            return None
+        payload, expires_at = entry
+        if expires_at <= time.time():
+            del _token_cache[digest]
+            return None
+        _token_cache.move_to_end(digest)
+        return dict(payload)
+
+def _cache_payload(digest: bytes, payload: dict):
+    expires_at = min(payload.get("exp", 0), time.time() + TOKEN_CACHE_TTL_SECONDS)
+    with _token_cache_lock:
+        _token_cache[digest] = (dict(payload), expires_at)
+        _token_cache.move_to_end(digest)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last = False)
+
+def evict_cached_token(token: str):
+    with _token_cache_lock:
+        _token_cache.pop(_token_digest(token), None)
 
 def create_access_token(data: dict, role: str):
     expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES_DICT[role]
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes = expires_minutes)
-    to_encode.update({"exp": expire, "role": role})
+    # jti: identificador corto del token, que es lo único que se guarda al revocarlo.
+    to_encode.update({"exp": expire, "role": role, "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, SECRET_KEY, algorithm = ALGORITHM)
 
 def create_refresh_token(data: dict):
@@ -41,12 +70,29 @@ def create_refresh_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, REFRESH_SECRET_KEY, algorithm = ALGORITHM)
 
-def verify_access_token(token: str):
+def _revocation_key(token: str, payload: dict):
+    jti = payload.get("jti")
+    # Los tokens emitidos antes de añadir el jti se revocaban guardando el token entero.
+    if jti is None:
+        return token
+    # El caso habitual: el filtro local asegura que no está revocado, sin ir a Redis.
+    if not revocation_filter.might_be_revoked(jti):
+        return None
+    return REVOKED_KEY_PREFIX + jti
+
+async def verify_access_token(token: str):
     try:
+        # Un token verificado hace poco no vuelve a pasar por jwt.decode.
+        digest = _token_digest(token)
+        payload = _get_cached_payload(digest)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms = [ALGORITHM])
+            _cache_payload(digest, payload)
         # Verificar si el token está revocado.
-        if redis_client.exists(token):
+        key = _revocation_key(token, payload)
+        if key is not None and await get_async_redis().exists(key):
+            evict_cached_token(token)
             raise JWTError("Token has been revoked.")
-        payload = jwt.decode(token, SECRET_KEY, algorithms = [ALGORITHM])
         return payload
     except JWTError:
         return None
@@ -58,7 +104,22 @@ def verify_refresh_token(token: str):
     except JWTError:
         return None
 
-def revoke_token(token: str):
-    # Revocar un token y almacenarlo en Redis, pasándole el segundos el tiempo
-    # máximo que dura un toquen para que lo almacene durante esa cantidad de tiempo.
-    redis_client.setex(token, timedelta(seconds = ACCESS_TOKEN_EXPIRE_MINUTES_DICT["admin"] * 60), "revoked")
+async def revoke_token(token: str):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms = [ALGORITHM], options = {"verify_exp": False})
+    except JWTError:
+        return
+    # Sólo hace falta recordarlo mientras el token siga siendo válido.
+    remaining_seconds = int(payload.get("exp", 0) - time.time()) + 1
+    evict_cached_token(token)
+    if remaining_seconds <= 0:
+        return
+    client = get_async_redis()
+    jti = payload.get("jti")
+    if jti is None:
+        await client.setex(token, remaining_seconds, "revoked")
+        return
+    # Guardar sólo el jti y avisar al resto de procesos para que lo añadan a su filtro.
+    await client.setex(REVOKED_KEY_PREFIX + jti, remaining_seconds, "revoked")
+    revocation_filter.add(jti)
+    await client.publish(REVOCATION_CHANNEL, jti)
@@ -0,0 +1,107 @@
+import hashlib
+import math
+import os
+import threading
+import time
+import redis
+from db.redis import get_redis
+
+# Claves de Redis de los tokens revocados: "revoked:<jti>" con TTL = vida restante del token.
+REVOKED_KEY_PREFIX = "revoked:"
+# Canal por el que se avisa al resto de procesos de cada revocación.
+REVOCATION_CHANNEL = "revoked_tokens"
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", 100000))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", 0.001))
+# Un filtro de Bloom no permite borrar: se reconstruye desde Redis cada cierto tiempo
+# para olvidar los tokens ya caducados y recuperar mensajes perdidos.
+REVOCATION_FILTER_REBUILD_SECONDS = int(os.getenv("REVOCATION_FILTER_REBUILD_SECONDS", 300))
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, item: str):
+        # Doble hashing (Kirsch-Mitzenmacher): k posiciones a partir de un solo digest.
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size = 16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        with self._lock:
+            for position in self._positions(item):
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationFilter:
+    # Filtro local de revocaciones recientes, sincronizado por pub/sub. Si dice que un
+    # jti no está, el token no se ha revocado y no hace falta preguntar a Redis.
+    def __init__(self):
+        self._filter = BloomFilter(REVOCATION_FILTER_CAPACITY, REVOCATION_FILTER_ERROR_RATE)
+        self._ready = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target = self._listen, name = "revocation-listener", daemon = True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout = 5)
+            self._thread = None
+        self._ready = False
+
+    def add(self, jti: str):
+        self._filter.add(jti)
+
+    def might_be_revoked(self, jti: str) -> bool:
+        # Mientras el filtro no esté sincronizado se consulta siempre a Redis.
+        if not self._ready:
+            self.start()
+            return True
+        return jti in self._filter
+
+    def rebuild(self):
+        client = get_redis()
+        jtis = [key[len(REVOKED_KEY_PREFIX):] for key in client.scan_iter(match = REVOKED_KEY_PREFIX + "*", count = 1000)]
+        new_filter = BloomFilter(max(REVOCATION_FILTER_CAPACITY, len(jtis) * 2), REVOCATION_FILTER_ERROR_RATE)
+        for jti in jtis:
+            new_filter.add(jti)
+        self._filter = new_filter
+
+    def _listen(self):
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages = True)
+                pubsub.subscribe(REVOCATION_CHANNEL)
+                # Se reconstruye después de suscribirse para no perder revocaciones entre medias.
+                self.rebuild()
+                self._ready = True
+                next_rebuild = time.monotonic() + REVOCATION_FILTER_REBUILD_SECONDS
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout = 1.0)
+                    if message and message["type"] == "message":
+                        self.add(message["data"])
+                    if time.monotonic() >= next_rebuild:
+                        self.rebuild()
+                        next_rebuild = time.monotonic() + REVOCATION_FILTER_REBUILD_SECONDS
+            except redis.RedisError as e:
+                self._ready = False
+                print(f"Revocation listener error: {e}")
+                self._stop.wait(1.0)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+revocation_filter = RevocationFilter()
@@ -0,0 +1,226 @@
+# Prueba de carga: lanza una mezcla de peticiones realista (login, listados, CRUD de
+# tareas y lecturas con comprobación de propiedad) con N clientes concurrentes y mide
+# el throughput y la latencia p50/p95/p99 de cada ruta. Los resultados se pueden
+# guardar en JSON y comparar con los de otro commit.
+#
+# Uso (con la API arrancada y la base de datos sembrada con seeder.py):
+#   python -m benchmarks.load_test --base-url http://localhost:8000 --concurrency 20 --duration 30 --output after.json
+#   python -m benchmarks.load_test --compare before.json ...
+# Con --in-process la API se ejecuta en el mismo proceso (sin servidor HTTP).
+#
+# La mezcla se configura con --mix ruta=peso,... y la secuencia de operaciones de
+# cada cliente es reproducible con --seed.
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+import httpx
+
+DEFAULT_MIX = "login=1,list_tasks=10,my_tasks=10,read_task=10,task_crud=3"
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name.strip()}'. Available: {', '.join(OPERATIONS)}.")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.latencies = {}
+        self.errors = {}
+        self.recording = False
+
+    async def request(self, label: str, method: str, url: str, expected: int = 200, **kwargs):
+        started = time.perf_counter()
+        response = await self.client.request(method, url, **kwargs)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self.recording:
+            self.latencies.setdefault(label, []).append(elapsed_ms)
+            if response.status_code != expected:
+                # Por código de estado: un 503 del pool de bcrypt no es lo mismo que un 500.
+                codes = self.errors.setdefault(label, {})
+                codes[str(response.status_code)] = codes.get(str(response.status_code), 0) + 1
+        return response
+
+    async def login(self, name: str) -> dict:
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login", data = {"username": name, "password": self.args.password})
+        if response.status_code != 200:
+            raise SystemExit(f"Login as '{name}' failed ({response.status_code}): {response.text}")
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def setup(self):
+        self.admin = await self.login(self.args.admin)
+        self.user = await self.login(self.args.user)
+        todo_lists = (await self.client.get("/api/todo_list/mine", headers = self.user)).json()
+        tasks = (await self.client.get("/api/task/mine", params = {"fields": "id"}, headers = self.user)).json()
+        statuses = (await self.client.get("/api/task_status/", headers = self.admin)).json()
+        if not todo_lists or not tasks or not statuses:
+            raise SystemExit(f"'{self.args.user}' needs todo lists and tasks; run python seeder.py first.")
+        self.todo_list_id = todo_lists[0]["id"]
+        self.task_ids = [task["id"] for task in tasks]
+        self.status_id = statuses[0]["id"]
+
+    # Operaciones de la mezcla. Cada una registra sus peticiones con la etiqueta de la ruta.
+    async def op_login(self, rng: random.Random):
+        await self.request("POST /api/auth/login", "POST", "/api/auth/login", data = {"username": self.args.user, "password": self.args.password})
+
+    async def op_list_tasks(self, rng: random.Random):
+        await self.request("GET /api/task/", "GET", "/api/task/", params = {"limit": self.args.page_size}, headers = self.admin)
+
+    async def op_my_tasks(self, rng: random.Random):
+        await self.request("GET /api/task/mine", "GET", "/api/task/mine", params = {"limit": self.args.page_size}, headers = self.user)
+
+    async def op_read_task(self, rng: random.Random):
+        await self.request("GET /api/task/{id}", "GET", f"/api/task/{rng.choice(self.task_ids)}", headers = self.user)
+
+    async def op_task_crud(self, rng: random.Random):
+        task = {
+            "title": f"Load test {rng.randrange(1_000_000)}",
+            "description": "",
+            "is_completed": False,
+            "todo_list_id": self.todo_list_id,
+            "status_id": self.status_id,
+        }
+        response = await self.request("POST /api/task/", "POST", "/api/task/", json = task, headers = self.admin)
+        if response.status_code != 200:
+            return
+        task_id = response.json()["id"]
+        await self.request("PUT /api/task/{id}", "PUT", f"/api/task/{task_id}", json = {"is_completed": True}, headers = self.user)
+        await self.request("DELETE /api/task/{id}", "DELETE", f"/api/task/{task_id}", headers = self.user)
+
+    async def worker(self, index: int, weights: dict, deadline: float):
+        rng = random.Random(self.args.seed + index)
+        names, values = list(weights), list(weights.values())
+        while time.perf_counter() < deadline:
+            await OPERATIONS[rng.choices(names, values)[0]](self, rng)
+
+    async def run(self, weights: dict):
+        # Calentamiento sin registrar: conexiones, cachés y procesos de bcrypt.
+        await asyncio.gather(*(self.worker(i, weights, time.perf_counter() + self.args.warmup) for i in range(self.args.concurrency)))
+        self.recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*(self.worker(i, weights, started + self.args.duration) for i in range(self.args.concurrency)))
+        self.elapsed = time.perf_counter() - started
+        self.recording = False
+
+    def summary(self) -> dict:
+        def stats(latencies: list, errors: dict) -> dict:
+            return {
+                "requests": len(latencies),
+                "errors": sum(errors.values()),
+                "error_codes": errors,
+                "rps": len(latencies) / self.elapsed,
+                "mean_ms": statistics.fmean(latencies) if latencies else 0.0,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+            }
+        routes = {label: stats(values, self.errors.get(label, {})) for label, values in sorted(self.latencies.items())}
+        every = [value for values in self.latencies.values() for value in values]
+        total_errors = {}
+        for codes in self.errors.values():
+            for code, count in codes.items():
+                total_errors[code] = total_errors.get(code, 0) + count
+        return {"routes": routes, "total": stats(every, total_errors)}
+
+OPERATIONS = {
+    "login": LoadTest.op_login,
+    "list_tasks": LoadTest.op_list_tasks,
+    "my_tasks": LoadTest.op_my_tasks,
+    "read_task": LoadTest.op_read_task,
+    "task_crud": LoadTest.op_task_crud,
+}
+
+def print_summary(summary: dict, baseline: dict = None):
+    header = f"{'route':<26} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + ("  p95 vs baseline" if baseline else ""))
+    rows = list(summary["routes"].items()) + [("TOTAL", summary["total"])]
+    for label, stats in rows:
+        line = f"{label:<26} {stats['requests']:>7} {stats['errors']:>5} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        if baseline:
+            old = baseline["total"] if label == "TOTAL" else baseline["routes"].get(label)
+            if old and old["p95_ms"]:
+                line += f"  {(stats['p95_ms'] / old['p95_ms'] - 1) * 100:+7.1f} %"
+        if stats["error_codes"]:
+            line += "  errors: " + ", ".join(f"{code} x{count}" for code, count in sorted(stats["error_codes"].items()))
+        print(line)
+
+async def main():
+    parser = argparse.ArgumentParser(description = "Prueba de carga con latencias por ruta.")
+    parser.add_argument("--base-url", default = "http://localhost:8000")
+    parser.add_argument("--in-process", action = "store_true", help = "Ejecuta la API en este proceso en lugar de usar --base-url.")
+    parser.add_argument("--concurrency", type = int, default = 10)
+    parser.add_argument("--duration", type = float, default = 30.0)
+    parser.add_argument("--warmup", type = float, default = 3.0)
+    parser.add_argument("--mix", default = DEFAULT_MIX)
+    parser.add_argument("--page-size", type = int, default = 100)
+    parser.add_argument("--seed", type = int, default = 42)
+    parser.add_argument("--admin", default = "Admin")
+    parser.add_argument("--user", default = "User")
+    parser.add_argument("--password", default = "123")
+    parser.add_argument("--output", help = "Fichero JSON donde guardar los resultados.")
+    parser.add_argument("--compare", help = "Resultados JSON de otra ejecución con los que comparar.")
+    args = parser.parse_args()
+    weights = parse_mix(args.mix)
+
+    if args.in_process:
+        from main import app
+        # ASGITransport no ejecuta el lifespan de la aplicación: se arranca aquí.
+        lifespan = app.router.lifespan_context(app)
+        transport, base_url = httpx.ASGITransport(app = app), "http://testserver"
+    else:
+        lifespan = contextlib.nullcontext()
+        transport, base_url = None, args.base_url
+    limits = httpx.Limits(max_connections = args.concurrency, max_keepalive_connections = args.concurrency)
+    async with lifespan, httpx.AsyncClient(base_url = base_url, transport = transport, limits = limits, timeout = 60.0) as client:
+        load_test = LoadTest(client, args)
+        await load_test.setup()
+        await load_test.run(weights)
+
+    results = {
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("password", "output", "compare")},
+        "duration_s": load_test.elapsed,
+        **load_test.summary(),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        print(f"Baseline: commit {baseline.get('commit')} ({baseline.get('started_at')})")
+    print(f"Commit {results['commit']}, {args.concurrency} clients, {load_test.elapsed:.1f}s")
+    print_summary(results, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent = 2)
+    if results["total"]["errors"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+# Benchmark del pool de procesos de bcrypt: mide cuántos logins por segundo
+# se verifican con distintos tamaños de pool y, a la vez, la latencia de una
+# "ruta barata" que sólo necesita el bucle de eventos (p50/p99 del retraso).
+#
+# Uso: python -m benchmarks.password_hashing --duration 5 --workers 1 2 4
+#
+# El modo "inline" reproduce el comportamiento antiguo (bcrypt dentro del
+# proceso que atiende peticiones) como referencia.
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from auth import hashing
+
+TICK_SECONDS = 0.005
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+async def cheap_route(stop: asyncio.Event, lags: list):
+    # Simula las demás rutas: cada tick debería despertar a tiempo si el bucle está libre.
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append((time.perf_counter() - started - TICK_SECONDS) * 1000)
+
+async def login_storm(stop: asyncio.Event, verify, hashed: str, counter: list):
+    while not stop.is_set():
+        await verify("123", hashed)
+        counter[0] += 1
+
+async def run(mode: str, workers: int, duration: float, hashed: str):
+    if mode == "inline":
+        async def verify(plain, hashed_password):
+            result = hashing.verify_password(plain, hashed_password)
+            # Cede el bucle entre verificaciones, como haría una petición real.
+            await asyncio.sleep(0)
+            return result
+        concurrency = 1
+    else:
+        hashing.shutdown_hashing_executor()
+        hashing.HASHING_WORKERS = workers
+        hashing.HASHING_MAX_PENDING = workers * 4
+        # Arranca los procesos antes de medir.
+        await asyncio.gather(*(hashing.verify_password_async("123", hashed) for _ in range(workers)))
+        verify = hashing.verify_password_async
+        concurrency = workers * 2
+
+    stop = asyncio.Event()
+    lags, counter = [], [0]
+    tasks = [asyncio.create_task(cheap_route(stop, lags))]
+    tasks += [asyncio.create_task(login_storm(stop, verify, hashed, counter)) for _ in range(concurrency)]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        "logins_per_second": counter[0] / duration,
+        "cheap_route_lag_p50_ms": statistics.median(lags) if lags else 0.0,
+        "cheap_route_lag_p99_ms": percentile(lags, 99),
+    }
+
+async def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description = "Throughput de bcrypt y latencia del resto de rutas.")
+    parser.add_argument("--duration", type = float, default = 5.0)
+    parser.add_argument("--workers", type = int, nargs = "+", default = sorted({1, max(1, cpus // 2), cpus}))
+    args = parser.parse_args()
+
+    hashed = hashing.hash_password("123")
+    print(f"{'mode':<14} {'logins/s':>10} {'lag p50 ms':>11} {'lag p99 ms':>11}")
+    result = await run("inline", 1, args.duration, hashed)
+    print(f"{'inline':<14} {result['logins_per_second']:>10.1f} {result['cheap_route_lag_p50_ms']:>11.2f} {result['cheap_route_lag_p99_ms']:>11.2f}")
+    for workers in args.workers:
+        result = await run("pool", workers, args.duration, hashed)
+        print(f"{f'pool x{workers}':<14} {result['logins_per_second']:>10.1f} {result['cheap_route_lag_p50_ms']:>11.2f} {result['cheap_route_lag_p99_ms']:>11.2f}")
+    hashing.shutdown_hashing_executor()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+# Comprueba el presupuesto de consultas SQL de las rutas principales: cada petición
+# se ejecuta dentro de query_budget y el script termina con código 1 si alguna se
+# pasa. Sirve para detectar un N+1 nuevo antes de que llegue a producción.
+#
+# Uso (con la base de datos sembrada con seeder.py): python -m benchmarks.query_budgets
+#
+# Con --verbose muestra las sentencias de cada petición.
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+import httpx
+from db.query_audit import QueryBudgetExceeded, query_budget
+
+# (método, ruta, presupuesto, usuario). La ruta admite {task_id}, {todo_list_id} y {status_id}.
+# Las escrituras de tareas que cambian filas añaden el pg_notify del feed de eventos.
+BUDGETS = [
+    ("GET", "/api/task/{task_id}", 1, "user"),
+    ("GET", "/api/task/", 1, "admin"),
+    ("GET", "/api/task/mine", 1, "user"),
+    ("GET", "/api/task/calendar", 1, "user"),
+    ("GET", "/api/task/due_date/{today}", 1, "user"),
+    ("PUT", "/api/task/{task_id}", 2, "user"),
+    ("GET", "/api/todo_list/{todo_list_id}", 1, "user"),
+    ("GET", "/api/todo_list/", 1, "admin"),
+    ("GET", "/api/todo_list/mine", 1, "user"),
+    ("GET", "/api/user/", 1, "admin"),
+    ("GET", "/api/task_status/", 1, "user"),
+    ("GET", "/api/task_status/{status_id}", 1, "user"),
+    ("DELETE", "/api/task/{task_id}", 2, "admin"),
+]
+
+async def login(client: httpx.AsyncClient, name: str, password: str) -> dict:
+    response = await client.post("/api/auth/login", data = {"username": name, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def main():
+    parser = argparse.ArgumentParser(description = "Presupuesto de consultas SQL por ruta.")
+    parser.add_argument("--admin", default = "Admin")
+    parser.add_argument("--user", default = "User")
+    parser.add_argument("--password", default = "123")
+    parser.add_argument("--verbose", action = "store_true")
+    args = parser.parse_args()
+
+    from main import app
+    failures = 0
+    async with app.router.lifespan_context(app), httpx.AsyncClient(transport = httpx.ASGITransport(app = app), base_url = "http://testserver") as client:
+        headers = {"admin": await login(client, args.admin, args.password), "user": await login(client, args.user, args.password)}
+        todo_list = (await client.get("/api/todo_list/mine", headers = headers["user"], params = {"limit": 1})).json()[0]
+        status = (await client.get("/api/task_status/", headers = headers["user"])).json()[0]
+        # Tarea propia y desechable para las rutas que escriben.
+        due_date = datetime.now(timezone.utc) + timedelta(days = 1)
+        task = (await client.post("/api/task/", headers = headers["admin"], json = {
+            "title": "Query budget", "description": "", "due_date": due_date.isoformat(), "is_completed": False,
+            "todo_list_id": todo_list["id"], "status_id": status["id"],
+        })).json()
+        values = {"task_id": task["id"], "todo_list_id": todo_list["id"], "status_id": status["id"], "today": due_date.date().isoformat()}
+        bodies = {"PUT": {"title": "Query budget (updated)"}}
+
+        print(f"{'route':<42} {'queries':>7} {'budget':>6}")
+        for method, route, budget, role in BUDGETS:
+            label = f"{method} {route}"
+            try:
+                with query_budget(budget, label) as audit:
+                    response = await client.request(method, route.format(**values), headers = headers[role], json = bodies.get(method))
+                result = "ok"
+            except QueryBudgetExceeded as e:
+                result = "EXCEEDED"
+                failures += 1
+                print(e)
+            if response.status_code >= 400:
+                result = f"HTTP {response.status_code}"
+                failures += 1
+            print(f"{label:<42} {audit.count:>7} {budget:>6}  {result}")
+            if args.verbose:
+                print(audit.summary())
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+# Benchmark de planes de consulta: carga un volumen grande de datos sintéticos,
+# ejecuta las consultas más usadas de crud/ y comprueba con EXPLAIN que usan un
+# índice en lugar de recorrer la tabla entera.
+#
+# Uso: python -m benchmarks.query_plans --users 10000 --lists-per-user 5 --tasks-per-list 40
+#
+# Todo se ejecuta dentro de una transacción que se deshace al final, así que la
+# base de datos queda como estaba (salvo las tablas e índices, que se crean si faltan).
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlmodel import select
+from db.database import engine, create_db_and_tables
+from models.user import User
+from models.todo_list import Todo_List
+from models.task import Task
+from models.task_status import Task_Status
+from crud.task import owned_tasks_statement, task_calendar_statement
+from crud.todo_list import owned_todo_lists_statement
+
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+SEED_STATEMENTS = [
+    "SELECT setseed(0.42)",
+    """
+    INSERT INTO "user" (name, email, role, hashed_password)
+    SELECT 'bench_user_' || g, 'bench_user_' || g || '@example.com', 'user', 'x'
+    FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO todo_list (title, description, owner_id)
+    SELECT 'Bench list ' || u.id || '-' || g, '', u.id
+    FROM "user" AS u CROSS JOIN generate_series(1, :lists_per_user) AS g
+    WHERE u.name LIKE 'bench_user_%'
+    """,
+    """
+    INSERT INTO task_status (name, color)
+    VALUES ('bench_common', 'Grey'), ('bench_rare', 'Red')
+    """,
+    # 80 % de las tareas completadas y un 1 % con un estado poco frecuente, como en producción.
+    """
+    INSERT INTO task (title, description, due_date, is_completed, todo_list_id, status_id, created_at)
+    SELECT
+        'Bench task ' || l.id || '-' || g,
+        'Benchmark task',
+        now() + (random() * 60 - 30) * interval '1 day',
+        random() < 0.8,
+        l.id,
+        CASE WHEN random() < 0.01
+            THEN (SELECT id FROM task_status WHERE name = 'bench_rare')
+            ELSE (SELECT id FROM task_status WHERE name = 'bench_common')
+        END,
+        now()
+    FROM todo_list AS l CROSS JOIN generate_series(1, :tasks_per_list) AS g
+    WHERE l.title LIKE 'Bench list %'
+    """,
+    "ANALYZE \"user\"",
+    "ANALYZE todo_list",
+    "ANALYZE task_status",
+    "ANALYZE task",
+]
+
+def hot_queries(connection):
+    sample = connection.execute(text(
+        "SELECT l.id, l.owner_id, u.name AS owner_name FROM todo_list AS l JOIN \"user\" AS u ON u.id = l.owner_id "
+        "WHERE l.title LIKE 'Bench list %' LIMIT 1"
+    )).one()
+    rare_status_id = connection.execute(text("SELECT id FROM task_status WHERE name = 'bench_rare'")).scalar_one()
+    day = datetime.now(timezone.utc).replace(hour = 0, minute = 0, second = 0, microsecond = 0) + timedelta(days = 3)
+    return {
+        "tasks_by_title": select(Task).where(Task.title == f"Bench task {sample.id}-1"),
+        "tasks_due_on_day": select(Task).where(Task.due_date >= day, Task.due_date < day + timedelta(days = 1)),
+        "tasks_of_list": select(Task).where(Task.todo_list_id == sample.id).order_by(Task.due_date),
+        "open_tasks_of_list": select(Task).where(Task.todo_list_id == sample.id, Task.is_completed == False).order_by(Task.due_date),
+        "overdue_open_tasks": select(Task).where(Task.is_completed == False, Task.due_date < day).order_by(Task.due_date).limit(100),
+        "tasks_by_status": select(Task).where(Task.status_id == rare_status_id),
+        "todo_lists_by_owner": select(Todo_List).where(Todo_List.owner_id == sample.owner_id),
+        "tasks_of_owner": owned_tasks_statement(sample.owner_name).order_by(Task.id).limit(100),
+        "todo_lists_of_owner": owned_todo_lists_statement(sample.owner_name).order_by(Todo_List.id).limit(100),
+        "calendar_of_owner": task_calendar_statement(sample.owner_name, day - timedelta(days = 7), day + timedelta(days = 21), "week"),
+    }
+
+def plan_node_types(plan: dict):
+    yield plan["Node Type"]
+    for child in plan.get("Plans", []):
+        yield from plan_node_types(child)
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect = connection.dialect)
+    sql = str(compiled)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", compiled.params).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    started = time.perf_counter()
+    connection.exec_driver_sql(sql, compiled.params).fetchall()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return plan[0]["Plan"], elapsed_ms
+
+def main():
+    parser = argparse.ArgumentParser(description = "Comprueba que las consultas calientes usan índices.")
+    parser.add_argument("--users", type = int, default = 10000)
+    parser.add_argument("--lists-per-user", type = int, default = 5)
+    parser.add_argument("--tasks-per-list", type = int, default = 40)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    failures = []
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            started = time.perf_counter()
+            params = {"users": args.users, "lists_per_user": args.lists_per_user, "tasks_per_list": args.tasks_per_list}
+            for statement in SEED_STATEMENTS:
+                connection.execute(text(statement), params)
+            total_tasks = args.users * args.lists_per_user * args.tasks_per_list
+            print(f"Seeded {total_tasks} tasks in {time.perf_counter() - started:.1f}s")
+
+            for name, statement in hot_queries(connection).items():
+                plan, elapsed_ms = explain(connection, statement)
+                node_types = set(plan_node_types(plan))
+                uses_index = bool(node_types & INDEX_NODE_TYPES)
+                if not uses_index:
+                    failures.append(name)
+                print(f"{'OK  ' if uses_index else 'FAIL'} {name:<22} {elapsed_ms:8.2f} ms  {', '.join(sorted(node_types))}")
+        finally:
+            transaction.rollback()
+
+    if failures:
+        print(f"Queries without an index: {', '.join(failures)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Micro-benchmark de serialización: tiempo de convertir en JSON una página de tareas
+# (10 000 por defecto) por el camino de response_model de FastAPI, con el codificador
+# json estándar y con orjson, frente al camino rápido de routes/responses.py
+# (filas planas TaskRow y un TypeAdapter cacheado). No necesita base de datos.
+#
+# Uso: python -m benchmarks.serialization --tasks 10000 --repeat 20
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from models.task import Task, TaskRow
+from routes.responses import rows_response
+
+def make_rows(count: int) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "title": f"Task {i}",
+            "description": "Benchmark task description",
+            "due_date": now + timedelta(days = i % 30),
+            "is_completed": i % 3 == 0,
+            "todo_list_id": i % 50 + 1,
+            "status_id": i % 2 + 1,
+            "id": i + 1,
+            "created_at": now,
+        }
+        for i in range(count)
+    ]
+
+async def response_model_body(tasks: list, response_class) -> bytes:
+    # Lo mismo que hace FastAPI con response_model = list[Task]: validar, pasar a tipos
+    # JSON y codificar con la clase de respuesta.
+    field = create_model_field("Response_read_all", list[Task], mode = "serialization")
+    content = await serialize_response(field = field, response_content = tasks)
+    return response_class(content).body
+
+async def measure(name: str, make_body, repeat: int):
+    timings = []
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = await make_body()
+        timings.append((time.perf_counter() - started) * 1000)
+    return name, statistics.median(timings), min(timings), len(body)
+
+async def main():
+    parser = argparse.ArgumentParser(description = "Tiempo de serialización de una lista de tareas.")
+    parser.add_argument("--tasks", type = int, default = 10000)
+    parser.add_argument("--repeat", type = int, default = 20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.tasks)
+    tasks = [Task(**row) for row in rows]
+
+    async def fast_path():
+        return rows_response(rows, TaskRow).body
+
+    results = [
+        await measure("response_model + json", lambda: response_model_body(tasks, JSONResponse), args.repeat),
+        await measure("response_model + orjson", lambda: response_model_body(tasks, ORJSONResponse), args.repeat),
+        await measure("TaskRow TypeAdapter", fast_path, args.repeat),
+    ]
+    print(f"{args.tasks} tasks, median of {args.repeat} runs")
+    print(f"{'path':<26} {'median ms':>10} {'min ms':>8} {'bytes':>10}")
+    for name, median_ms, min_ms, size in results:
+        print(f"{name:<26} {median_ms:>10.2f} {min_ms:>8.2f} {size:>10}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
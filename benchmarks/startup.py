@@ -0,0 +1,78 @@
+# Benchmark del arranque en frío de un worker: cada medición se hace en un proceso
+# nuevo, como ocurre tras un fork, un reload o al importar la aplicación en un test.
+#
+# Uso: python -m benchmarks.startup --runs 5
+#
+# Mide tres fases: importar main (no debe hacer E/S), ejecutar el lifespan y servir
+# la primera petición a /api/health/ready. Con --importtime muestra además los
+# módulos que más tardan en importarse.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+from main import app
+imported = time.perf_counter()
+import httpx
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        async with httpx.AsyncClient(transport = httpx.ASGITransport(app = app), base_url = "http://testserver") as client:
+            response = await client.get("/api/health/ready")
+        first = time.perf_counter()
+    return {
+        "import_ms": (imported - started) * 1000,
+        "lifespan_ms": (ready - imported) * 1000,
+        "first_request_ms": (first - ready) * 1000,
+        "ready_status": response.status_code,
+    }
+print(json.dumps(asyncio.run(main())))
+"""
+
+def run_probe(env: dict) -> dict:
+    output = subprocess.run([sys.executable, "-c", PROBE], capture_output = True, text = True, env = env, check = True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(env: dict, top: int) -> list:
+    # -X importtime escribe en stderr: "import time: self [us] | cumulative | paquete".
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], capture_output = True, text = True, env = env, check = True).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # La sangría indica la profundidad: un espacio para main y dos más por nivel.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        # Sólo lo que importa main directamente, para no contar dos veces el coste de un submódulo.
+        if depth == 1:
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse = True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description = "Tiempo de arranque en frío de un worker.")
+    parser.add_argument("--runs", type = int, default = 5)
+    parser.add_argument("--seed-on-startup", action = "store_true", help = "Incluye la comprobación del esquema y la siembra en el lifespan.")
+    parser.add_argument("--importtime", type = int, default = 0, metavar = "N", help = "Muestra los N imports más lentos.")
+    args = parser.parse_args()
+
+    env = dict(os.environ, SEED_ON_STARTUP = "true" if args.seed_on_startup else "false")
+    results = [run_probe(env) for _ in range(args.runs)]
+    print(f"{'phase':<18} {'median ms':>10} {'max ms':>10}")
+    for phase in ("import_ms", "lifespan_ms", "first_request_ms"):
+        values = [result[phase] for result in results]
+        print(f"{phase:<18} {statistics.median(values):>10.1f} {max(values):>10.1f}")
+    statuses = sorted({result["ready_status"] for result in results})
+    print(f"ready status: {', '.join(map(str, statuses))}")
+
+    if args.importtime:
+        print(f"\n{'cumulative ms':>13}  module")
+        for cumulative, name in slowest_imports(env, args.importtime):
+            print(f"{cumulative / 1000:>13.1f}  {name}")
+
+if __name__ == "__main__":
+    main()
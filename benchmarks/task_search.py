@@ -0,0 +1,114 @@
+# Benchmark de la búsqueda de tareas: carga millones de tareas sintéticas y compara
+# el filtrado con ILIKE (recorre la tabla entera, como filtrar en el cliente) con la
+# búsqueda de texto completo sobre el índice GIN y, si pg_trgm está instalada, con
+# la búsqueda aproximada por trigramas. Muestra los nodos del plan y el tiempo.
+#
+# Uso: python -m benchmarks.task_search --users 10000 --lists-per-user 5 --tasks-per-list 40
+#
+# Todo se ejecuta dentro de una transacción que se deshace al final.
+import argparse
+import time
+from sqlalchemy import func, or_, select as sa_select, text
+from sqlmodel import select
+from db.database import engine, create_db_and_tables
+from models.user import User
+from models.todo_list import Todo_List
+from models.task import Task
+from models.task_status import Task_Status
+from crud.task import search_tasks_statement, fuzzy_search_tasks_statement, SEARCH_FUZZY_THRESHOLD
+from benchmarks.query_plans import explain, plan_node_types
+
+# Palabra poco frecuente (1 de cada 2000 tareas) para que la búsqueda sea selectiva.
+RARE_PHRASE = "quarterly report"
+TYPO = "quartely"
+
+SEED_STATEMENTS = [
+    "SELECT setseed(0.42)",
+    """
+    INSERT INTO "user" (name, email, role, hashed_password)
+    SELECT 'bench_user_' || g, 'bench_user_' || g || '@example.com', 'user', 'x'
+    FROM generate_series(1, :users) AS g
+    """,
+    """
+    INSERT INTO todo_list (title, description, owner_id)
+    SELECT 'Bench list ' || u.id || '-' || g, '', u.id
+    FROM "user" AS u CROSS JOIN generate_series(1, :lists_per_user) AS g
+    WHERE u.name LIKE 'bench_user_%'
+    """,
+    "INSERT INTO task_status (name, color) VALUES ('bench_search', 'Grey')",
+    """
+    INSERT INTO task (title, description, due_date, is_completed, todo_list_id, status_id, created_at)
+    SELECT
+        CASE WHEN random() < 0.0005 THEN initcap(:rare_phrase) ELSE
+            w.words[1 + floor(random() * array_length(w.words, 1))::int] || ' ' ||
+            w.words[1 + floor(random() * array_length(w.words, 1))::int]
+        END,
+        'Notes about ' || w.words[1 + floor(random() * array_length(w.words, 1))::int],
+        now() + (random() * 60 - 30) * interval '1 day',
+        random() < 0.8,
+        l.id,
+        (SELECT id FROM task_status WHERE name = 'bench_search'),
+        now()
+    FROM todo_list AS l
+    CROSS JOIN generate_series(1, :tasks_per_list) AS g
+    CROSS JOIN (SELECT ARRAY[
+        'buy', 'milk', 'call', 'email', 'review', 'draft', 'plan', 'meeting', 'invoice', 'budget',
+        'deploy', 'fix', 'bug', 'write', 'docs', 'clean', 'kitchen', 'book', 'flight', 'pay',
+        'rent', 'update', 'slides', 'prepare', 'interview', 'order', 'groceries', 'renew', 'license', 'backup'
+    ] AS words) AS w
+    WHERE l.title LIKE 'Bench list %'
+    """,
+    "ANALYZE \"user\"",
+    "ANALYZE todo_list",
+    "ANALYZE task",
+]
+
+def search_queries(connection, trigram_available: bool):
+    owner_name = connection.execute(text(
+        "SELECT u.name FROM task AS t JOIN todo_list AS l ON l.id = t.todo_list_id JOIN \"user\" AS u ON u.id = l.owner_id "
+        "WHERE t.title = initcap(:rare_phrase) LIMIT 1"
+    ), {"rare_phrase": RARE_PHRASE}).scalar_one()
+    pattern = f"%{RARE_PHRASE}%"
+    queries = {
+        "ilike_scan": select(Task).where(or_(Task.title.ilike(pattern), Task.description.ilike(pattern))).limit(100),
+        "fulltext": search_tasks_statement(RARE_PHRASE).limit(100),
+        "fulltext_of_owner": search_tasks_statement(RARE_PHRASE, owner_name).limit(100),
+        "fulltext_common_word": search_tasks_statement("invoice").limit(100),
+    }
+    if trigram_available:
+        queries["fuzzy"] = fuzzy_search_tasks_statement(TYPO).limit(100)
+        queries["fuzzy_of_owner"] = fuzzy_search_tasks_statement(TYPO, owner_name).limit(100)
+    return queries
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compara ILIKE, texto completo y trigramas sobre millones de tareas.")
+    parser.add_argument("--users", type = int, default = 10000)
+    parser.add_argument("--lists-per-user", type = int, default = 5)
+    parser.add_argument("--tasks-per-list", type = int, default = 40)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            trigram_available = connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is not None
+            if trigram_available:
+                connection.execute(sa_select(func.set_config("pg_trgm.word_similarity_threshold", str(SEARCH_FUZZY_THRESHOLD), True)))
+            else:
+                print("pg_trgm is not installed: fuzzy search is skipped.")
+            started = time.perf_counter()
+            params = {"users": args.users, "lists_per_user": args.lists_per_user, "tasks_per_list": args.tasks_per_list, "rare_phrase": RARE_PHRASE}
+            for statement in SEED_STATEMENTS:
+                connection.execute(text(statement), params)
+            total_tasks = args.users * args.lists_per_user * args.tasks_per_list
+            print(f"Seeded {total_tasks} tasks in {time.perf_counter() - started:.1f}s")
+
+            for name, statement in search_queries(connection, trigram_available).items():
+                plan, elapsed_ms = explain(connection, statement)
+                node_types = sorted(set(plan_node_types(plan)))
+                print(f"{name:<22} {elapsed_ms:9.2f} ms  {', '.join(node_types)}")
+        finally:
+            transaction.rollback()
+
+if __name__ == "__main__":
+    main()
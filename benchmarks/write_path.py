@@ -0,0 +1,138 @@
+# Benchmark del camino de escritura: compara el patrón antiguo de los handlers
+# (leer la fila, modificarla en Python, commit y refresh) con el UPDATE/DELETE
+# ... RETURNING de crud/. Cuenta las idas y vueltas a la base de datos (BEGIN,
+# sentencias y COMMIT) y mide la latencia p50/p99 de cada operación.
+#
+# Uso: python -m benchmarks.write_path --operations 500
+#
+# Las filas que crea el benchmark se borran al terminar.
+import argparse
+import asyncio
+import statistics
+import time
+from sqlalchemy import event
+from sqlmodel import select, delete
+from db.database import async_engine, async_session_maker, create_db_and_tables
+from models.user import User
+from models.todo_list import Todo_List
+from models.task import Task
+from models.task_status import Task_Status
+from crud.task import update_task, delete_task
+
+BENCH_USER_NAME = "bench_write_path"
+
+round_trips = [0]
+
+def count_round_trip(*args, **kwargs):
+    round_trips[0] += 1
+
+for event_name in ("begin", "commit", "rollback", "before_cursor_execute"):
+    event.listen(async_engine.sync_engine, event_name, count_round_trip)
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+async def legacy_update(task_id: int, data: dict):
+    # Lo que hacían antes los handlers: comprobar que existe y luego actualizar.
+    async with async_session_maker() as session:
+        task = (await session.exec(select(Task).where(Task.id == task_id))).first()
+        if not task:
+            return None
+        task = (await session.exec(select(Task).where(Task.id == task_id))).first()
+        for key, value in data.items():
+            setattr(task, key, value)
+        session.add(task)
+        await session.commit()
+        await session.refresh(task)
+        return task
+
+async def legacy_delete(task_id: int):
+    async with async_session_maker() as session:
+        task = (await session.exec(select(Task).where(Task.id == task_id))).first()
+        if not task:
+            return None
+        task = (await session.exec(select(Task).where(Task.id == task_id))).first()
+        await session.delete(task)
+        await session.commit()
+        return task
+
+async def returning_update(task_id: int, data: dict):
+    async with async_session_maker() as session:
+        return await update_task(session, task_id, data, BENCH_USER_NAME)
+
+async def returning_delete(task_id: int):
+    async with async_session_maker() as session:
+        return await delete_task(session, task_id, BENCH_USER_NAME)
+
+async def seed(operations: int):
+    async with async_session_maker() as session:
+        user = User(name = BENCH_USER_NAME, email = f"{BENCH_USER_NAME}@example.com", role = "user", hashed_password = "x")
+        session.add(user)
+        await session.flush()
+        todo_list = Todo_List(title = "Bench write path", description = "", owner_id = user.id)
+        task_status = Task_Status(name = "bench_write_path", color = "Grey")
+        session.add_all([todo_list, task_status])
+        await session.flush()
+        tasks = [Task(title = f"Bench task {i}", is_completed = False, todo_list_id = todo_list.id, status_id = task_status.id) for i in range(operations * 2)]
+        session.add_all(tasks)
+        await session.commit()
+        return user.id, todo_list.id, task_status.id, [task.id for task in tasks]
+
+async def cleanup(user_id: int, todo_list_id: int, status_id: int):
+    async with async_session_maker() as session:
+        await session.exec(delete(Task).where(Task.todo_list_id == todo_list_id))
+        await session.exec(delete(Todo_List).where(Todo_List.id == todo_list_id))
+        await session.exec(delete(Task_Status).where(Task_Status.id == status_id))
+        await session.exec(delete(User).where(User.id == user_id))
+        await session.commit()
+
+async def measure(name: str, operation, task_ids: list, *args):
+    latencies = []
+    round_trips[0] = 0
+    for task_id in task_ids:
+        started = time.perf_counter()
+        result = await operation(task_id, *args)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if result is None:
+            raise RuntimeError(f"{name}: task {task_id} not found.")
+    return {
+        "name": name,
+        "round_trips_per_op": round_trips[0] / len(task_ids),
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description = "Idas y vueltas y latencia de UPDATE/DELETE por id.")
+    parser.add_argument("--operations", type = int, default = 500)
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    async with async_session_maker() as session:
+        leftover = (await session.exec(select(User).where(User.name == BENCH_USER_NAME))).first()
+    if leftover:
+        raise SystemExit(f"User '{BENCH_USER_NAME}' already exists; remove it before running the benchmark.")
+    user_id, todo_list_id, status_id, task_ids = await seed(args.operations)
+    legacy_ids, returning_ids = task_ids[:args.operations], task_ids[args.operations:]
+    try:
+        # Calienta el pool de conexiones antes de medir.
+        await returning_update(returning_ids[0], {"is_completed": False})
+        results = [
+            await measure("legacy update", legacy_update, legacy_ids, {"is_completed": True}),
+            await measure("returning update", returning_update, returning_ids, {"is_completed": True}),
+            await measure("legacy delete", legacy_delete, legacy_ids),
+            await measure("returning delete", returning_delete, returning_ids),
+        ]
+    finally:
+        await cleanup(user_id, todo_list_id, status_id)
+        await async_engine.dispose()
+
+    print(f"{'operation':<18} {'round trips':>12} {'p50 ms':>8} {'p99 ms':>8}")
+    for result in results:
+        print(f"{result['name']:<18} {result['round_trips_per_op']:>12.1f} {result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
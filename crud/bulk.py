@@ -0,0 +1,37 @@
+from pydantic import ValidationError
+from sqlmodel import select, insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models.bulk import BulkItemError
+
+# Máximo de elementos aceptados en una sola petición de creación masiva.
+BULK_MAX_ITEMS = 10000
+# Filas por sentencia INSERT: Postgres admite como mucho 65535 parámetros por sentencia.
+BULK_INSERT_CHUNK_SIZE = 1000
+
+def validation_error_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+
+def validate_items(items: list, schema):
+    # Valida todos los elementos en una pasada y separa los válidos de los erróneos.
+    valid, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            errors.append(BulkItemError(index = index, detail = validation_error_detail(e)))
+    return valid, errors
+
+async def existing_ids(session: AsyncSession, column, ids: set) -> set:
+    if not ids:
+        return set()
+    return set((await session.exec(select(column).where(column.in_(ids)))).all())
+
+async def insert_returning(session: AsyncSession, model, rows: list):
+    # INSERT multi-fila con RETURNING: una sentencia por cada bloque de filas y los
+    # objetos creados en el mismo orden en que se recibieron.
+    created = []
+    statement = insert(model).returning(model, sort_by_parameter_order = True)
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        result = await session.exec(statement, params = rows[start:start + BULK_INSERT_CHUNK_SIZE])
+        created.extend(result.scalars().all())
+    return created
\ No newline at end of file
@@ -0,0 +1,49 @@
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+# Vida máxima de una entrada. Cada proceso tiene su propia caché y sólo se invalida
+# con las escrituras que pasan por él; el TTL acota cuánto tardan en verlas los demás.
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 60))
+
+@dataclass(frozen = True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    expires_at: float
+
+class ResponseCache:
+    # Respuesta ya serializada de una colección que cambia poco (p. ej. los estados de
+    # tarea). Las funciones de crud/ que escriben en la tabla llaman a invalidate().
+    def __init__(self, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entry = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def get(self) -> Optional[CachedResponse]:
+        entry = self._entry
+        if entry is None or entry.expires_at <= time.monotonic():
+            return None
+        return entry
+
+    def store(self, version: int, body: bytes) -> CachedResponse:
+        # ETag fuerte: depende sólo de los bytes de la respuesta.
+        entry = CachedResponse(body, f'"{hashlib.blake2b(body, digest_size = 16).hexdigest()}"', time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            # Si hubo una escritura mientras se leía la tabla, no se guarda el resultado viejo.
+            if version == self._version:
+                self._entry = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._entry = None
@@ -0,0 +1,21 @@
+from typing import Optional
+from sqlalchemy import select
+
+def row_columns(model, row_type, fields: Optional[str] = None, key: str = "id") -> list:
+    # Traduce ?fields=a,b en las columnas del SELECT. Los campos de la fila de lectura
+    # (row_type) hacen de lista blanca; la clave de paginación se incluye siempre.
+    allowed = list(row_type.__annotations__)
+    if fields is None:
+        return [getattr(model, name) for name in allowed]
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        raise ValueError("The fields parameter must name at least one field.")
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed fields: {', '.join(allowed)}.")
+    return [getattr(model, name) for name in allowed if name in requested or name == key]
+
+def select_row_columns(model, row_type, fields: Optional[str] = None, key: str = "id"):
+    # select() de SQLAlchemy y no el de sqlmodel: con una sola columna aquel devuelve
+    # escalares en lugar de filas con nombre.
+    return select(*row_columns(model, row_type, fields, key)).select_from(model)
@@ -0,0 +1,32 @@
+from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 1000
+
+def paginate(statement, column, limit: Optional[int], after: Optional[int] = None):
+    # Paginación por keyset: en lugar de OFFSET se filtra por la última clave vista,
+    # así cada página recorre el índice de la clave y cuesta lo mismo que la primera.
+    if after is not None:
+        statement = statement.where(column > after)
+    statement = statement.order_by(column)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+async def fetch_rows(session: AsyncSession, statement) -> list[dict]:
+    # Lecturas de columnas sueltas: diccionarios planos, sin crear objetos del ORM.
+    return [dict(row) for row in (await session.exec(statement)).mappings()]
+
+async def fetch_row(session: AsyncSession, statement) -> Optional[dict]:
+    row = (await session.exec(statement)).mappings().first()
+    return dict(row) if row is not None else None
+
+async def stream_rows(session: AsyncSession, statement, batch_size: int = STREAM_BATCH_SIZE):
+    # stream() abre un cursor del lado del servidor y yield_per trae las filas por
+    # lotes, de modo que la memoria no crece con el tamaño de la tabla. Como fetch_rows,
+    # devuelve diccionarios con las columnas del SELECT.
+    result = await session.stream(statement.execution_options(yield_per = batch_size))
+    async for row in result.mappings():
+        yield dict(row)
@@ -0,0 +1,91 @@
+import os
+import threading
+from typing import Optional
+from sqlalchemy import column, func, select, table
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.database import engine
+from models.report import REPORT_VIEWS, ListCompletionReport, StatusCountReport, OwnerOverdueReport, DailyActivityReport
+from crud.pagination import DEFAULT_PAGE_SIZE, paginate
+import datetime
+
+# Cada cuánto se refrescan las vistas de informes.
+REPORT_REFRESH_SECONDS = int(os.getenv("REPORT_REFRESH_SECONDS", 300))
+# Clave del advisory lock de PostgreSQL: con varios procesos, sólo uno refresca a la vez.
+REPORT_REFRESH_LOCK_ID = 7_140_001
+
+def _report_table(name: str, model):
+    return table(name, *(column(field) for field in model.model_fields))
+
+list_completion_report = _report_table("report_list_completion", ListCompletionReport)
+status_count_report = _report_table("report_status_counts", StatusCountReport)
+owner_overdue_report = _report_table("report_owner_overdue", OwnerOverdueReport)
+daily_activity_report = _report_table("report_daily_activity", DailyActivityReport)
+
+def refresh_report_views() -> bool:
+    # Devuelve False si otro proceso ya está refrescando. CONCURRENTLY no bloquea las
+    # lecturas de los informes mientras se recalculan.
+    with engine.connect().execution_options(isolation_level = "AUTOCOMMIT") as connection:
+        if not connection.execute(select(func.pg_try_advisory_lock(REPORT_REFRESH_LOCK_ID))).scalar():
+            return False
+        try:
+            for view_name in REPORT_VIEWS:
+                connection.exec_driver_sql(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view_name}")
+        finally:
+            connection.execute(select(func.pg_advisory_unlock(REPORT_REFRESH_LOCK_ID)))
+    return True
+
+class ReportRefresher:
+    # Hilo que refresca las vistas cada REPORT_REFRESH_SECONDS. Se arranca con la primera
+    # lectura de un informe: un proceso que no sirve informes no necesita refrescarlos.
+    def __init__(self, interval_seconds: int = REPORT_REFRESH_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target = self._run, name = "report-refresher", daemon = True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout = 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                refresh_report_views()
+            except Exception as e:
+                print(f"Report refresh error: {e}")
+            self._stop.wait(self.interval_seconds)
+
+report_refresher = ReportRefresher()
+
+async def _read_report(session: AsyncSession, statement, model):
+    report_refresher.start()
+    return [model(**row._mapping) for row in (await session.exec(statement)).all()]
+
+async def get_list_completion_report(session: AsyncSession, owner_id: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
+    statement = select(list_completion_report)
+    if owner_id is not None:
+        statement = statement.where(list_completion_report.c.owner_id == owner_id)
+    return await _read_report(session, paginate(statement, list_completion_report.c.todo_list_id, limit, after), ListCompletionReport)
+
+async def get_status_count_report(session: AsyncSession):
+    statement = select(status_count_report).order_by(status_count_report.c.status_id)
+    return await _read_report(session, statement, StatusCountReport)
+
+async def get_owner_overdue_report(session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None):
+    statement = paginate(select(owner_overdue_report), owner_overdue_report.c.owner_id, limit, after)
+    return await _read_report(session, statement, OwnerOverdueReport)
+
+async def get_daily_activity_report(session: AsyncSession, since: Optional[datetime.date] = None, until: Optional[datetime.date] = None):
+    statement = select(daily_activity_report).order_by(daily_activity_report.c.day)
+    if since is not None:
+        statement = statement.where(daily_activity_report.c.day >= since)
+    if until is not None:
+        statement = statement.where(daily_activity_report.c.day < until)
+    return await _read_report(session, statement, DailyActivityReport)
@@ -0,0 +1,40 @@
+from functools import lru_cache
+from pydantic import TypeAdapter
+from sqlmodel import update, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+@lru_cache(maxsize = None)
+def _field_adapter(model, key: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[key].annotation)
+
+def column_values(model, data: dict) -> dict:
+    # Valida y convierte los valores recibidos con el tipo de cada campo del modelo,
+    # ya que un UPDATE directo no pasa por la validación de SQLModel.
+    values = {}
+    for key, value in data.items():
+        if key == "id" or key not in model.model_fields:
+            raise ValueError(f"Unknown field '{key}' for {model.__name__}.")
+        values[key] = _field_adapter(model, key).validate_python(value)
+    if not values:
+        raise ValueError("No fields to update.")
+    return values
+
+async def update_returning(session: AsyncSession, model, clauses: list, data: dict, before_commit = None):
+    # Un único UPDATE ... WHERE ... RETURNING: sin leer la fila antes ni refrescarla después.
+    # before_commit(session, row) se ejecuta dentro de la misma transacción.
+    statement = update(model).where(*clauses).values(**column_values(model, data)).returning(model)
+    result = await session.exec(statement, execution_options = {"synchronize_session": False})
+    row = result.scalars().first()
+    if row is not None and before_commit is not None:
+        await before_commit(session, row)
+    await session.commit()
+    return row
+
+async def delete_returning(session: AsyncSession, model, clauses: list, before_commit = None):
+    statement = delete(model).where(*clauses).returning(model)
+    result = await session.exec(statement, execution_options = {"synchronize_session": False})
+    row = result.scalars().first()
+    if row is not None and before_commit is not None:
+        await before_commit(session, row)
+    await session.commit()
+    return row
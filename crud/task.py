@@ -1,44 +1,267 @@
-from sqlmodel import Session, select
-from models.task import Task
+from sqlmodel import select, update, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import and_, cast, func, literal, literal_column, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from typing import Optional
+from models.task import Task, TaskCreate, TaskFilter, TaskCalendarEntry, TaskRow, TASK_SEARCH_CONFIG, task_search_vector
+from models.todo_list import Todo_List
+from models.user import User
+from models.task_status import Task_Status
+from models.bulk import BulkItemError
+from crud.pagination import DEFAULT_PAGE_SIZE, paginate, fetch_row, fetch_rows
+from crud.fields import select_row_columns
+from crud.bulk import validate_items, existing_ids, insert_returning
+from crud.returning import column_values, update_returning, delete_returning
+from crud.task_events import notify_task_changes
 import datetime
+import os
 
-def create_task(session: Session, task: Task):
+# Desplazamiento máximo de la búsqueda: las páginas profundas de un ranking no tienen utilidad.
+SEARCH_MAX_OFFSET = 1000
+SEARCH_MAX_QUERY_LENGTH = 200
+# Similitud mínima (0-1) entre la búsqueda y alguna parte del título en la búsqueda aproximada.
+SEARCH_FUZZY_THRESHOLD = float(os.getenv("SEARCH_FUZZY_THRESHOLD", 0.3))
+
+# Agrupaciones del calendario (valores de date_trunc) y rango máximo que se puede pedir.
+CALENDAR_GRANULARITIES = ("day", "week")
+CALENDAR_MAX_DAYS = 366
+
+# Se comprueba una vez por proceso si pg_trgm está instalada.
+_trigram_available = None
+
+def owned_todo_list_ids(owner_name: str):
+    return select(Todo_List.id).join(User, User.id == Todo_List.owner_id).where(User.name == owner_name)
+
+def task_owner_clause(owner_name: str):
+    # Restringe a las tareas de las listas del usuario, resuelto en la propia consulta.
+    return Task.todo_list_id.in_(owned_todo_list_ids(owner_name))
+
+def join_task_owner(statement, owner_name: str):
+    # Task JOIN Todo_List JOIN User: las tareas del usuario en una sola consulta.
+    return (
+        statement
+        .join(Todo_List, Todo_List.id == Task.todo_list_id)
+        .join(User, User.id == Todo_List.owner_id)
+        .where(User.name == owner_name)
+    )
+
+def owned_tasks_statement(owner_name: str):
+    return join_task_owner(select(Task), owner_name)
+
+def as_utc(value: datetime.datetime) -> datetime.datetime:
+    # Las fechas sin zona horaria se interpretan en UTC.
+    return value.replace(tzinfo = datetime.timezone.utc) if value.tzinfo is None else value
+
+def utc_day_start(day: datetime.date) -> datetime.datetime:
+    return datetime.datetime.combine(day, datetime.time.min, tzinfo = datetime.timezone.utc)
+
+def due_date_clauses(due_after: Optional[datetime.datetime] = None, due_before: Optional[datetime.datetime] = None):
+    # Intervalo semiabierto [due_after, due_before): lo resuelve el índice (todo_list_id, due_date).
+    clauses = []
+    if due_after is not None:
+        clauses.append(Task.due_date >= as_utc(due_after))
+    if due_before is not None:
+        clauses.append(Task.due_date < as_utc(due_before))
+    return clauses
+
+def task_filter_clauses(task_filter: TaskFilter):
+    clauses = []
+    if task_filter.todo_list_id is not None:
+        clauses.append(Task.todo_list_id == task_filter.todo_list_id)
+    if task_filter.status_id is not None:
+        clauses.append(Task.status_id == task_filter.status_id)
+    if task_filter.is_completed is not None:
+        clauses.append(Task.is_completed == task_filter.is_completed)
+    clauses += due_date_clauses(task_filter.due_after, task_filter.due_before)
+    # Como en due_date_clauses, una fecha sin zona horaria se interpreta en UTC.
+    if task_filter.created_before is not None:
+        clauses.append(Task.created_at < as_utc(task_filter.created_before))
+    return clauses
+
+def notify_before_commit(op: str):
+    # Callback de update_returning/delete_returning: avisa del cambio en la misma transacción.
+    async def before_commit(session: AsyncSession, task: Task):
+        await notify_task_changes(session, op, [(task.id, task.todo_list_id)])
+    return before_commit
+
+async def create_task(session: AsyncSession, task: Task):
     session.add(task)
-    session.commit()
-    session.refresh(task)
+    # El flush asigna el id para el aviso, que sale sólo si el commit tiene éxito.
+    await session.flush()
+    await notify_task_changes(session, "created", [(task.id, task.todo_list_id)])
+    await session.commit()
+    await session.refresh(task)
     return task
 
-def get_tasks(session: Session):
-    return session.exec(select(Task)).all()
+async def create_tasks_bulk(session: AsyncSession, items: list):
+    valid, errors = validate_items(items, TaskCreate)
+    # Comprobar las claves foráneas de todos los elementos con una consulta por tabla.
+    todo_list_ids = await existing_ids(session, Todo_List.id, {task.todo_list_id for _, task in valid})
+    status_ids = await existing_ids(session, Task_Status.id, {task.status_id for _, task in valid})
+    created_at = datetime.datetime.now(datetime.timezone.utc)
+    rows = []
+    for index, task in valid:
+        if task.todo_list_id not in todo_list_ids:
+            errors.append(BulkItemError(index = index, detail = f"Todo list with ID {task.todo_list_id} not found."))
+        elif task.status_id not in status_ids:
+            errors.append(BulkItemError(index = index, detail = f"Task status with ID {task.status_id} not found."))
+        else:
+            rows.append({**task.model_dump(), "created_at": created_at})
+    created = await insert_returning(session, Task, rows)
+    await notify_task_changes(session, "created", [(task.id, task.todo_list_id) for task in created])
+    await session.commit()
+    errors.sort(key = lambda error: error.index)
+    return created, errors
+
+async def get_tasks(session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None, fields: Optional[str] = None):
+    # Sólo se leen las columnas pedidas en fields (todas las de TaskRow por defecto).
+    statement = select_row_columns(Task, TaskRow, fields)
+    return await fetch_rows(session, paginate(statement, Task.id, limit, after))
+
+def stream_tasks_statement(after: Optional[int] = None, fields: Optional[str] = None):
+    # Todas las filas tras el cursor, con las mismas columnas que el listado paginado.
+    return paginate(select_row_columns(Task, TaskRow, fields), Task.id, None, after)
 
-def get_task_by_id(session: Session, task_id: int):
-    return session.get(Task, task_id)
+async def get_task_by_id(session: AsyncSession, task_id: int):
+    return await session.get(Task, task_id)
 
-def get_tasks_by_title(session: Session, title: str):
+async def get_task_with_owner_name(session: AsyncSession, task_id: int, fields: Optional[str] = None):
+    # Devuelve (fila con los campos pedidos, nombre del dueño de su lista) o None, con una sola consulta.
+    statement = (
+        select_row_columns(Task, TaskRow, fields)
+        .add_columns(User.name.label("owner_name"))
+        .join(Todo_List, Todo_List.id == Task.todo_list_id)
+        .join(User, User.id == Todo_List.owner_id)
+        .where(Task.id == task_id)
+    )
+    row = await fetch_row(session, statement)
+    return (row, row.pop("owner_name")) if row is not None else None
+
+async def get_tasks_by_owner(
+    session: AsyncSession,
+    owner_name: str,
+    title: Optional[str] = None,
+    due_date: Optional[datetime.date] = None,
+    due_after: Optional[datetime.datetime] = None,
+    due_before: Optional[datetime.datetime] = None,
+    completed: Optional[bool] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[int] = None,
+    fields: Optional[str] = None,
+):
+    statement = join_task_owner(select_row_columns(Task, TaskRow, fields), owner_name).where(*due_date_clauses(due_after, due_before))
+    if title is not None:
+        statement = statement.where(Task.title == title)
+    if due_date is not None:
+        # Todo el día (UTC), no sólo el instante de medianoche.
+        day_start = utc_day_start(due_date)
+        statement = statement.where(*due_date_clauses(day_start, day_start + datetime.timedelta(days = 1)))
+    if completed is not None:
+        statement = statement.where(Task.is_completed == completed)
+    return await fetch_rows(session, paginate(statement, Task.id, limit, after))
+
+def search_tasks_statement(query: str, owner_name: Optional[str] = None):
+    # Búsqueda de texto completo sobre la columna generada (índice GIN), por relevancia.
+    tsquery = func.websearch_to_tsquery(cast(literal(TASK_SEARCH_CONFIG), REGCONFIG), query)
+    statement = select(Task) if owner_name is None else owned_tasks_statement(owner_name)
+    return statement.where(task_search_vector.bool_op("@@")(tsquery)).order_by(func.ts_rank_cd(task_search_vector, tsquery).desc(), Task.id)
+
+def fuzzy_search_tasks_statement(query: str, owner_name: Optional[str] = None):
+    # Búsqueda por trigramas del título (índice GIN de pg_trgm), por similitud.
+    statement = select(Task) if owner_name is None else owned_tasks_statement(owner_name)
+    return statement.where(Task.title.bool_op("%>")(query)).order_by(func.word_similarity(query, Task.title).desc(), Task.id)
+
+async def trigram_search_available(session: AsyncSession) -> bool:
+    global _trigram_available
+    if _trigram_available is None:
+        result = await session.exec(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+        _trigram_available = result.first() is not None
+    return _trigram_available
+
+async def search_tasks(session: AsyncSession, query: str, owner_name: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0):
+    statement = search_tasks_statement(query, owner_name).limit(limit).offset(offset)
+    tasks = (await session.exec(statement)).all()
+    if tasks or not await trigram_search_available(session):
+        return tasks
+    # Sólo se pasa a la búsqueda aproximada si el texto completo no encuentra nada,
+    # para que todas las páginas de una misma búsqueda usen el mismo criterio.
+    if offset and (await session.exec(search_tasks_statement(query, owner_name).limit(1))).first():
+        return tasks
+    await session.exec(select(func.set_config("pg_trgm.word_similarity_threshold", str(SEARCH_FUZZY_THRESHOLD), True)))
+    return (await session.exec(fuzzy_search_tasks_statement(query, owner_name).limit(limit).offset(offset))).all()
+
+async def get_tasks_by_title(session: AsyncSession, title: str):
     statement = select(Task).where(Task.title == title)
-    return session.exec(statement).all()
-
-def get_tasks_by_due_date(session: Session, due_date: datetime):
-    statement = select(Task).where(Task.due_date == due_date)
-    return session.exec(statement).all()
-
-def get_tasks_by_completed(session: Session, completed: bool):
-    statement = select(Task).where(Task.completed == completed)
-    return session.exec(statement).all()
-
-def update_task(session: Session, task_id: int, task_data: dict):
-    task = session.get(Task, task_id)
-    if not task:
-        return None
-    for key, value in task_data.items():
-        setattr(task, key, value)
-    session.commit()
-    session.refresh(task)
-    return task
+    return (await session.exec(statement)).all()
+
+async def get_tasks_by_due_date(session: AsyncSession, due_date: datetime.date, owner_name: Optional[str] = None):
+    # Todas las tareas que vencen ese día (UTC), no sólo las de medianoche exacta.
+    day_start = utc_day_start(due_date)
+    statement = select(Task) if owner_name is None else owned_tasks_statement(owner_name)
+    statement = statement.where(*due_date_clauses(day_start, day_start + datetime.timedelta(days = 1))).order_by(Task.due_date)
+    return (await session.exec(statement)).all()
+
+async def get_tasks_by_completed(session: AsyncSession, completed: bool, owner_name: Optional[str] = None):
+    statement = select(Task) if owner_name is None else owned_tasks_statement(owner_name)
+    statement = statement.where(Task.is_completed == completed)
+    return (await session.exec(statement)).all()
+
+def task_calendar_statement(owner_name: str, due_after: datetime.datetime, due_before: datetime.datetime, granularity: str = "day"):
+    if granularity not in CALENDAR_GRANULARITIES:
+        raise ValueError(f"Granularity must be one of: {', '.join(CALENDAR_GRANULARITIES)}.")
+    now = datetime.datetime.now(datetime.timezone.utc)
+    # La agrupación va como literal (ya validado) para que el SELECT y el GROUP BY
+    # sean la misma expresión; con parámetros distintos PostgreSQL no los considera iguales.
+    period = func.date_trunc(literal_column(f"'{granularity}'"), Task.due_date, literal_column("'UTC'")).label("period")
+    statement = select(
+        period,
+        func.count().filter(and_(Task.is_completed == False, Task.due_date >= now)).label("open"),
+        func.count().filter(and_(Task.is_completed == False, Task.due_date < now)).label("overdue"),
+        func.count().filter(Task.is_completed == True).label("completed"),
+    ).select_from(Task)
+    statement = join_task_owner(statement, owner_name).where(*due_date_clauses(due_after, due_before))
+    return statement.group_by(period).order_by(period)
+
+async def get_task_calendar(session: AsyncSession, owner_name: str, due_after: datetime.datetime, due_before: datetime.datetime, granularity: str = "day"):
+    # Recuentos por día o semana calculados con GROUP BY date_trunc(...) en la base de datos.
+    rows = (await session.exec(task_calendar_statement(owner_name, due_after, due_before, granularity))).all()
+    return [TaskCalendarEntry(**row._mapping) for row in rows]
+
+async def update_task(session: AsyncSession, task_id: int, task_data: dict, owner_name: Optional[str] = None):
+    clauses = [Task.id == task_id]
+    if owner_name is not None:
+        clauses.append(task_owner_clause(owner_name))
+        # Mover la tarea a otra lista exige ser también dueño de la lista de destino.
+        if "todo_list_id" in task_data:
+            target_todo_list_id = column_values(Task, {"todo_list_id": task_data["todo_list_id"]})["todo_list_id"]
+            clauses.append(literal(target_todo_list_id).in_(owned_todo_list_ids(owner_name)))
+    return await update_returning(session, Task, clauses, task_data, notify_before_commit("updated"))
+
+async def delete_task(session: AsyncSession, task_id: int, owner_name: Optional[str] = None):
+    clauses = [Task.id == task_id]
+    if owner_name is not None:
+        clauses.append(task_owner_clause(owner_name))
+    return await delete_returning(session, Task, clauses, notify_before_commit("deleted"))
+
+async def update_tasks_by_filter(session: AsyncSession, task_filter: TaskFilter, task_data: dict, owner_name: Optional[str] = None):
+    # Un único UPDATE ... WHERE ... RETURNING id; la propiedad se comprueba en el WHERE.
+    clauses = task_filter_clauses(task_filter)
+    if owner_name is not None:
+        clauses.append(task_owner_clause(owner_name))
+    statement = update(Task).where(*clauses).values(**task_data).returning(Task.id, Task.todo_list_id)
+    result = await session.exec(statement, execution_options = {"synchronize_session": False})
+    changes = result.all()
+    await notify_task_changes(session, "updated", changes)
+    await session.commit()
+    return [task_id for task_id, _ in changes]
 
-def delete_task(session: Session, task_id: int):
-    task = session.get(Task, task_id)
-    if task:
-        session.delete(task)
-        session.commit()
-    return task
\ No newline at end of file
+async def delete_tasks_by_filter(session: AsyncSession, task_filter: TaskFilter, owner_name: Optional[str] = None):
+    clauses = task_filter_clauses(task_filter)
+    if owner_name is not None:
+        clauses.append(task_owner_clause(owner_name))
+    statement = delete(Task).where(*clauses).returning(Task.id, Task.todo_list_id)
+    result = await session.exec(statement, execution_options = {"synchronize_session": False})
+    changes = result.all()
+    await notify_task_changes(session, "deleted", changes)
+    await session.commit()
+    return [task_id for task_id, _ in changes]
\ No newline at end of file
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import os
+import signal
+import threading
+import asyncpg
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.database import DATABASE_URL
+
+# Canal de PostgreSQL por el que se publican los cambios de tareas.
+TASK_EVENTS_CHANNEL = "task_events"
+# Un NOTIFY admite como mucho 8000 bytes: por encima de este número de tareas el
+# evento no lleva ids y el cliente vuelve a pedir sus tareas.
+TASK_EVENTS_MAX_IDS = 300
+# Eventos pendientes por cliente; si un cliente lento los acumula se le pide que se resincronice.
+TASK_EVENTS_QUEUE_SIZE = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", 100))
+TASK_EVENTS_RECONNECT_SECONDS = 1.0
+
+# Un NOTIFY por dueño afectado, con el nombre y los ids resueltos en la propia consulta.
+# Se ejecuta dentro de la transacción del cambio: PostgreSQL sólo lo entrega si hay commit.
+_NOTIFY_STATEMENT = text("""
+SELECT pg_notify(:channel, json_build_object(
+    'op', CAST(:op AS text),
+    'owner', "user".name,
+    'todo_list_ids', CASE WHEN count(*) <= :max_ids THEN array_agg(DISTINCT changed.todo_list_id) END,
+    'task_ids', CASE WHEN count(*) <= :max_ids THEN array_agg(changed.id ORDER BY changed.id) END
+)::text)
+FROM unnest(CAST(:task_ids AS integer[]), CAST(:todo_list_ids AS integer[])) AS changed(id, todo_list_id)
+JOIN todo_list ON todo_list.id = changed.todo_list_id
+JOIN "user" ON "user".id = todo_list.owner_id
+GROUP BY todo_list.owner_id, "user".name
+""")
+
+async def notify_task_changes(session: AsyncSession, op: str, changes: list):
+    # changes: [(id de la tarea, id de su lista)]. Llamar antes del commit.
+    if not changes:
+        return
+    task_ids, todo_list_ids = zip(*changes)
+    await session.exec(_NOTIFY_STATEMENT, params = {
+        "channel": TASK_EVENTS_CHANNEL,
+        "op": op,
+        "max_ids": TASK_EVENTS_MAX_IDS,
+        "task_ids": list(task_ids),
+        "todo_list_ids": list(todo_list_ids),
+    })
+
+def sse_message(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+RESYNC_MESSAGE = sse_message("resync", "{}")
+
+class TaskEventHub:
+    # Una sola conexión LISTEN por proceso reparte los eventos a todos los clientes
+    # conectados. Cada evento se serializa una vez y se encola en los clientes de su dueño
+    # y en los de los admins (suscritos con None).
+    def __init__(self):
+        self._subscribers = {}
+        self._task = None
+
+    def subscribe(self, owner_name) -> asyncio.Queue:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+        queue = asyncio.Queue(maxsize = TASK_EVENTS_QUEUE_SIZE)
+        self._subscribers.setdefault(owner_name, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, owner_name, queue: asyncio.Queue):
+        queues = self._subscribers.get(owner_name)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[owner_name]
+
+    def _put(self, queue: asyncio.Queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Se descarta lo pendiente: el cliente recibe un resync y vuelve a leer sus tareas.
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESYNC_MESSAGE if message is not None else None)
+
+    def _broadcast(self, message):
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._put(queue, message)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        message = sse_message(event.get("op", "change"), payload)
+        for owner_name in (event.get("owner"), None):
+            for queue in self._subscribers.get(owner_name, ()):
+                self._put(queue, message)
+
+    async def _listen(self):
+        reconnecting = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(DATABASE_URL)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(TASK_EVENTS_CHANNEL, self._on_notification)
+                # Mientras no hubo conexión se pudieron perder eventos.
+                if reconnecting:
+                    self._broadcast(RESYNC_MESSAGE)
+                reconnecting = True
+                await lost.wait()
+            except (asyncpg.PostgresError, OSError) as e:
+                print(f"Task events listener error: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(TASK_EVENTS_RECONNECT_SECONDS)
+
+    def close_streams_on_exit(self):
+        # uvicorn espera a que se cierren las conexiones antes de apagar el lifespan, y un
+        # stream de eventos no se cierra solo: al recibir la señal de salida se cierran aquí
+        # y luego se llama al manejador de uvicorn (o de gunicorn).
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous = signal.getsignal(signum)
+            if not callable(previous):
+                continue
+            def handler(signum, frame, previous = previous):
+                loop.call_soon_threadsafe(self._broadcast, None)
+                previous(signum, frame)
+            signal.signal(signum, handler)
+
+    async def stop(self):
+        # None en cada cola cierra los streams abiertos para que el apagado no los espere.
+        self._broadcast(None)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+task_event_hub = TaskEventHub()
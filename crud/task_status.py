@@ -1,31 +1,31 @@
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from models.task_status import Task_Status
+from crud.returning import update_returning, delete_returning
+from crud.cache import ResponseCache
 
-def create_task_status(session: Session, task_status: Task_Status):
+# Respuesta de GET /api/task_status/; se invalida en cada escritura.
+task_statuses_cache = ResponseCache()
+
+async def create_task_status(session: AsyncSession, task_status: Task_Status):
     session.add(task_status)
-    session.commit()
-    session.refresh(task_status)
+    await session.commit()
+    await session.refresh(task_status)
+    task_statuses_cache.invalidate()
     return task_status
 
-def get_task_statuses(session: Session):
-    return session.exec(select(Task_Status)).all()
+async def get_task_statuses(session: AsyncSession):
+    return (await session.exec(select(Task_Status).order_by(Task_Status.id))).all()
 
-def get_task_status_by_id(session: Session, task_status_id: int):
-    return session.get(Task_Status, task_status_id)
+async def get_task_status_by_id(session: AsyncSession, task_status_id: int):
+    return await session.get(Task_Status, task_status_id)
 
-def update_task_status(session: Session, task_status_id: int, task_status_data: dict):
-    task_status = session.get(Task_Status, task_status_id)
-    if not task_status:
-        return None
-    for key, value in task_status_data.items():
-        setattr(task_status, key, value)
-    session.commit()
-    session.refresh(task_status)
+async def update_task_status(session: AsyncSession, task_status_id: int, task_status_data: dict):
+    task_status = await update_returning(session, Task_Status, [Task_Status.id == task_status_id], task_status_data)
+    task_statuses_cache.invalidate()
     return task_status
 
-def delete_task_status(session: Session, task_status_id: int):
-    task_status = session.get(Task_Status, task_status_id)
-    if task_status:
-        session.delete(task_status)
-        session.commit()
-    return task_status
\ No newline at end of file
+async def delete_task_status(session: AsyncSession, task_status_id: int):
+    task_status = await delete_returning(session, Task_Status, [Task_Status.id == task_status_id])
+    task_statuses_cache.invalidate()
+    return task_status
@@ -1,35 +1,94 @@
-from sqlmodel import Session, select
-from models.todo_list import Todo_List
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from models.todo_list import Todo_List, Todo_ListCreate, Todo_ListRow
+from models.user import User
+from models.bulk import BulkItemError
+from crud.pagination import DEFAULT_PAGE_SIZE, paginate, fetch_row, fetch_rows
+from crud.fields import select_row_columns
+from crud.bulk import validate_items, existing_ids, insert_returning
+from crud.returning import update_returning, delete_returning
 
-def create_todo_list(session: Session, todo_list: Todo_List):
+def todo_list_owner_clause(owner_name: str):
+    # Restringe a las listas del usuario, resuelto en la propia consulta.
+    return Todo_List.owner_id == select(User.id).where(User.name == owner_name).scalar_subquery()
+
+def join_todo_list_owner(statement, owner_name: str):
+    return statement.join(User, User.id == Todo_List.owner_id).where(User.name == owner_name)
+
+def owned_todo_lists_statement(owner_name: str):
+    return join_todo_list_owner(select(Todo_List), owner_name)
+
+async def create_todo_list(session: AsyncSession, todo_list: Todo_List):
     session.add(todo_list)
-    session.commit()
-    session.refresh(todo_list)
+    await session.commit()
+    await session.refresh(todo_list)
     return todo_list
 
-def get_todo_lists(session: Session):
-    return session.exec(select(Todo_List)).all()
+async def create_todo_lists_bulk(session: AsyncSession, items: list):
+    valid, errors = validate_items(items, Todo_ListCreate)
+    owner_ids = await existing_ids(session, User.id, {todo_list.owner_id for _, todo_list in valid})
+    rows = []
+    for index, todo_list in valid:
+        if todo_list.owner_id not in owner_ids:
+            errors.append(BulkItemError(index = index, detail = f"User with ID {todo_list.owner_id} not found."))
+        else:
+            rows.append(todo_list.model_dump())
+    created = await insert_returning(session, Todo_List, rows)
+    await session.commit()
+    errors.sort(key = lambda error: error.index)
+    return created, errors
+
+async def get_todo_lists(session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None, fields: Optional[str] = None):
+    statement = select_row_columns(Todo_List, Todo_ListRow, fields)
+    return await fetch_rows(session, paginate(statement, Todo_List.id, limit, after))
+
+def stream_todo_lists_statement(after: Optional[int] = None, fields: Optional[str] = None):
+    # Todas las filas tras el cursor, con las mismas columnas que el listado paginado.
+    return paginate(select_row_columns(Todo_List, Todo_ListRow, fields), Todo_List.id, None, after)
 
-def get_todo_list_by_id(session: Session, todo_list_id: int):
-    return session.get(Todo_List, todo_list_id)
+async def get_todo_list_by_id(session: AsyncSession, todo_list_id: int):
+    return await session.get(Todo_List, todo_list_id)
 
-def get_todo_list_by_name(session: Session, name: str):
+async def get_todo_list_with_owner_name(session: AsyncSession, todo_list_id: int, fields: Optional[str] = None):
+    # Devuelve (fila con los campos pedidos, nombre del dueño) o None, con una sola consulta.
+    statement = (
+        select_row_columns(Todo_List, Todo_ListRow, fields)
+        .add_columns(User.name.label("owner_name"))
+        .join(User, User.id == Todo_List.owner_id)
+        .where(Todo_List.id == todo_list_id)
+    )
+    row = await fetch_row(session, statement)
+    return (row, row.pop("owner_name")) if row is not None else None
+
+async def get_todo_lists_by_owner(
+    session: AsyncSession,
+    owner_name: str,
+    title: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[int] = None,
+    fields: Optional[str] = None,
+):
+    statement = join_todo_list_owner(select_row_columns(Todo_List, Todo_ListRow, fields), owner_name)
+    if title is not None:
+        statement = statement.where(Todo_List.title == title)
+    return await fetch_rows(session, paginate(statement, Todo_List.id, limit, after))
+
+async def get_todo_list_by_name(session: AsyncSession, name: str):
     statement = select(Todo_List).where(Todo_List.name == name)
-    return session.exec(statement).first()
-
-def update_todo_list(session: Session, todo_list_id: int, todo_list_data: dict):
-    todo_list = session.get(Todo_List, todo_list_id)
-    if not todo_list:
-        return None
-    for key, value in todo_list_data.items():
-        setattr(todo_list, key, value)
-    session.commit()
-    session.refresh(todo_list)
-    return todo_list
+    return (await session.exec(statement)).first()
+
+async def update_todo_list(session: AsyncSession, todo_list_id: int, todo_list_data: dict, owner_name: Optional[str] = None):
+    clauses = [Todo_List.id == todo_list_id]
+    if owner_name is not None:
+        # Sólo un admin puede cambiar el dueño de una lista.
+        if "owner_id" in todo_list_data:
+            raise ValueError("Only admins can change the owner of a todo list.")
+        clauses.append(todo_list_owner_clause(owner_name))
+    return await update_returning(session, Todo_List, clauses, todo_list_data)
 
-def delete_todo_list(session: Session, todo_list_id: int):
-    todo_list = session.get(Todo_List, todo_list_id)
-    if todo_list:
-        session.delete(todo_list)
-        session.commit()
-    return todo_list
\ No newline at end of file
+async def delete_todo_list(session: AsyncSession, todo_list_id: int, owner_name: Optional[str] = None):
+    clauses = [Todo_List.id == todo_list_id]
+    if owner_name is not None:
+        clauses.append(todo_list_owner_clause(owner_name))
+    return await delete_returning(session, Todo_List, clauses)
\ No newline at end of file
@@ -1,62 +1,75 @@
-from sqlmodel import Session, select
-from models.user import User
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from models.user import User, UserRow
+from crud.pagination import DEFAULT_PAGE_SIZE, paginate, fetch_row, fetch_rows
+from crud.fields import select_row_columns
+from crud.returning import update_returning, delete_returning
 
-def create_user(session: Session, user: User):
+async def create_user(session: AsyncSession, user: User):
     # Unique name check.
-    existing_user = session.exec(select(User).where(User.name == user.name)).first()
+    existing_user = (await session.exec(select(User).where(User.name == user.name))).first()
     if existing_user:
         raise ValueError(f"An user with name '{user.name}' already exists.")
     # Unique email check.
-    existing_user = session.exec(select(User).where(User.email == user.email)).first()
+    existing_user = (await session.exec(select(User).where(User.email == user.email))).first()
     if existing_user:
         raise ValueError(f"An user with email '{user.email}' already exists.")
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return user
 
-def get_users(session: Session):
-    return session.exec(select(User)).all()
+async def get_users(session: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, after: Optional[int] = None, fields: Optional[str] = None):
+    statement = select_row_columns(User, UserRow, fields)
+    return await fetch_rows(session, paginate(statement, User.id, limit, after))
 
-def get_user_by_id(session: Session, user_id: int):
-    return session.get(User, user_id)
+def stream_users_statement(after: Optional[int] = None, fields: Optional[str] = None):
+    # Todas las filas tras el cursor, con las mismas columnas que el listado paginado.
+    return paginate(select_row_columns(User, UserRow, fields), User.id, None, after)
 
-def get_user_by_name(session: Session, name: str):
-    statement = select(User).where(User.name == name)
-    return session.exec(statement).first()
-
-def update_user(session: Session, user_id: int, user_data: dict):
-    user = session.get(User, user_id)
-    if not user:
-        return None
-    for key, value in user_data.items():
-        setattr(user, key, value)
-    session.commit()
-    session.refresh(user)
-    return user
+async def get_user_by_id(session: AsyncSession, user_id: int):
+    return await session.get(User, user_id)
+
+async def get_user_row_with_name(session: AsyncSession, user_id: int, fields: Optional[str] = None):
+    # Devuelve (fila con los campos pedidos, nombre del usuario) o None; el nombre hace
+    # falta para comprobar permisos aunque no se haya pedido.
+    statement = select_row_columns(User, UserRow, fields).add_columns(User.name.label("owner_name")).where(User.id == user_id)
+    row = await fetch_row(session, statement)
+    return (row, row.pop("owner_name")) if row is not None else None
 
-def update_user_by_name(session: Session, name: str, user_data: dict):
+async def get_user_by_name(session: AsyncSession, name: str):
     statement = select(User).where(User.name == name)
-    user = session.exec(statement).first()
-    if not user:
-        return None
-    for key, value in user_data.items():
-        setattr(user, key, value)
-    session.commit()
-    session.refresh(user)
-    return user
+    return (await session.exec(statement)).first()
 
-def delete_user(session: Session, user_id: int):
-    user = session.get(User, user_id)
-    if user:
-        session.delete(user)
-        session.commit()
-    return user
+def _user_clauses(clause, owner_name: Optional[str]):
+    # Un usuario que no es admin sólo puede modificarse a sí mismo.
+    clauses = [clause]
+    if owner_name is not None:
+        clauses.append(User.name == owner_name)
+    return clauses
 
-def delete_user_by_name(session: Session, name: str):
-    statement = select(User).where(User.name == name)
-    user = session.exec(statement).first()
-    if user:
-        session.delete(user)
-        session.commit()
-    return user
\ No newline at end of file
+# Campos que un usuario que no es admin puede cambiar de sí mismo. El rol y las
+# credenciales (hashed_password, refresh_token) sólo los cambia un admin o el login.
+SELF_WRITABLE_USER_FIELDS = ("name", "email")
+
+def _check_user_data(user_data: dict, owner_name: Optional[str]):
+    if owner_name is None:
+        return
+    forbidden = set(user_data) - set(SELF_WRITABLE_USER_FIELDS)
+    if forbidden:
+        raise ValueError(f"Only admins can change: {', '.join(sorted(forbidden))}. Allowed fields: {', '.join(SELF_WRITABLE_USER_FIELDS)}.")
+
+async def update_user(session: AsyncSession, user_id: int, user_data: dict, owner_name: Optional[str] = None):
+    _check_user_data(user_data, owner_name)
+    return await update_returning(session, User, _user_clauses(User.id == user_id, owner_name), user_data)
+
+async def update_user_by_name(session: AsyncSession, name: str, user_data: dict, owner_name: Optional[str] = None):
+    _check_user_data(user_data, owner_name)
+    return await update_returning(session, User, _user_clauses(User.name == name, owner_name), user_data)
+
+async def delete_user(session: AsyncSession, user_id: int, owner_name: Optional[str] = None):
+    return await delete_returning(session, User, _user_clauses(User.id == user_id, owner_name))
+
+async def delete_user_by_name(session: AsyncSession, name: str, owner_name: Optional[str] = None):
+    return await delete_returning(session, User, _user_clauses(User.name == name, owner_name))
\ No newline at end of file
@@ -1,5 +1,12 @@
 import os
 from sqlmodel import SQLModel, create_engine, Session
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from db.metrics import instrument_engine
+from db.query_audit import QUERY_AUDIT_ENABLED, install_query_audit
 
 # Construct DATABASE_URL from individual environment variables.
 DB_USER = os.getenv("DB_USER", "postgres")
@@ -7,17 +14,72 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "123456")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME", "postgres")
+# Tamaño del pool de conexiones del motor asíncrono (por proceso).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 30))
+# Extensiones opcionales: si no se pueden instalar se omiten los índices que las necesitan.
+DB_EXTENSIONS = ["pg_trgm"]
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+# Motor síncrono para el seeder y los scripts; la API usa el asíncrono.
 engine = create_engine(DATABASE_URL, echo = False)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo = False,
+    pool_size = DB_POOL_SIZE,
+    max_overflow = DB_MAX_OVERFLOW,
+    pool_pre_ping = True,
+)
+# Métricas de consultas y del pool de la API (ver /metrics).
+instrument_engine(async_engine, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+if QUERY_AUDIT_ENABLED:
+    install_query_audit(async_engine)
+# expire_on_commit = False: después del commit los objetos siguen siendo legibles
+# sin lanzar otra consulta (en asíncrono esa carga implícita no está permitida).
+async_session_maker = async_sessionmaker(async_engine, class_ = AsyncSession, expire_on_commit = False)
+
+def create_extensions():
+    for extension in DB_EXTENSIONS:
+        try:
+            with engine.begin() as connection:
+                connection.exec_driver_sql(f"CREATE EXTENSION IF NOT EXISTS {extension}")
+        except DBAPIError as e:
+            print(f"Extension {extension} not available: {str(e.orig).splitlines()[0]}")
+
 def create_db_and_tables():
+    create_extensions()
     SQLModel.metadata.create_all(engine)
+    # create_all no modifica las tablas que ya existen: las columnas y los índices que
+    # falten se crean aparte. Sólo se añaden columnas que admiten NULL, generadas o con
+    # valor por defecto en el servidor; para cualquier otra se lanza un error.
+    existing_tables = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in existing_tables.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                # Una columna NOT NULL sin valor por defecto fallaría en una tabla con filas.
+                if not (column.nullable or column.computed is not None or column.server_default is not None):
+                    raise RuntimeError(
+                        f'Column "{table.name}.{column.name}" is missing and is NOT NULL without a server default; '
+                        "add it with a migration that fills existing rows."
+                    )
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {CreateColumn(column).compile(engine)}'))
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst = True)
 
 def drop_db_and_tables():
     SQLModel.metadata.drop_all(engine)
 
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session():
+    async with async_session_maker() as session:
+        yield session
@@ -0,0 +1,79 @@
+import contextvars
+import time
+from dataclasses import dataclass
+from typing import Optional
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+
+# Métricas en formato Prometheus. Registrar una observación sólo cuesta unas sumas en
+# memoria; el texto se genera únicamente cuando alguien consulta /metrics.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+http_request_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ["method", "route", "status"], buckets = LATENCY_BUCKETS)
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests being served.", multiprocess_mode = "livesum")
+sql_statements_per_request = Histogram("sql_statements_per_request", "SQL statements executed per HTTP request.", ["method", "route"], buckets = COUNT_BUCKETS)
+sql_seconds_per_request = Histogram("sql_seconds_per_request", "Time spent in SQL per HTTP request.", ["method", "route"], buckets = LATENCY_BUCKETS)
+sql_statement_duration = Histogram("sql_statement_duration_seconds", "Latency of each SQL statement.", buckets = LATENCY_BUCKETS)
+redis_round_trips_per_request = Histogram("redis_round_trips_per_request", "Redis round trips per HTTP request.", ["method", "route"], buckets = COUNT_BUCKETS)
+redis_round_trips = Counter("redis_round_trips", "Redis round trips.", ["client"])
+redis_round_trip_duration = Histogram("redis_round_trip_duration_seconds", "Latency of each Redis round trip.", ["client"], buckets = LATENCY_BUCKETS)
+# Los pools son de cada worker: con varios procesos se publica el del más cargado ("max"),
+# que es el que se satura primero.
+db_pool_checked_out = Gauge("db_pool_checked_out_connections", "Database connections in use by the busiest worker.", multiprocess_mode = "max")
+db_pool_capacity = Gauge("db_pool_capacity_connections", "Maximum database connections per worker (pool size plus overflow).", multiprocess_mode = "max")
+threadpool_busy = Gauge("threadpool_busy_threads", "Threads of the default threadpool in use by the busiest worker.", multiprocess_mode = "max")
+threadpool_capacity = Gauge("threadpool_capacity_threads", "Size of the default threadpool per worker.", multiprocess_mode = "max")
+db_replica_healthy = Gauge("db_replica_healthy", "1 if the read replica is reachable and within the lag limit.", ["replica"], multiprocess_mode = "max")
+db_replica_lag_seconds = Gauge("db_replica_lag_seconds", "Replication lag of each read replica.", ["replica"], multiprocess_mode = "max")
+hashing_pending = Gauge("hashing_pending_operations", "Password hashing operations queued or running in the busiest worker.", multiprocess_mode = "max")
+
+@dataclass(slots = True)
+class RequestStats:
+    sql_statements: int = 0
+    sql_seconds: float = 0.0
+    redis_round_trips: int = 0
+    redis_seconds: float = 0.0
+    # Espera a los procesos de bcrypt (no aparece en un perfil del proceso que atiende).
+    hashing_seconds: float = 0.0
+
+# Contadores de la petición en curso; None fuera de una petición (scripts, hilos).
+request_stats = contextvars.ContextVar("request_stats", default = None)
+
+def instrument_engine(engine, capacity: Optional[int] = None):
+    # Los eventos se registran en el motor síncrono que hay debajo del asíncrono. Las
+    # métricas del pool (capacity) sólo se publican para el motor principal.
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_started
+        sql_statement_duration.observe(elapsed)
+        stats = request_stats.get()
+        if stats is not None:
+            stats.sql_statements += 1
+            stats.sql_seconds += elapsed
+
+    if capacity is None:
+        return
+    db_pool_capacity.set(capacity)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checked_out.inc()
+
+    @event.listens_for(sync_engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        db_pool_checked_out.dec()
+
+def record_redis_round_trip(client: str, elapsed: float):
+    redis_round_trips.labels(client).inc()
+    redis_round_trip_duration.labels(client).observe(elapsed)
+    stats = request_stats.get()
+    if stats is not None:
+        stats.redis_round_trips += 1
+        stats.redis_seconds += elapsed
@@ -0,0 +1,119 @@
+import contextvars
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from sqlalchemy import event
+
+# Auditor de consultas opcional (QUERY_AUDIT=true): cuenta y cronometra las sentencias
+# de cada petición, avisa de las lentas y de las repetidas (el síntoma de un N+1).
+QUERY_AUDIT_ENABLED = os.getenv("QUERY_AUDIT", "false").lower() in ("1", "true", "yes")
+QUERY_AUDIT_SLOW_MS = float(os.getenv("QUERY_AUDIT_SLOW_MS", 100))
+# Veces que debe repetirse la misma sentencia en una petición para avisar.
+QUERY_AUDIT_REPEAT_THRESHOLD = int(os.getenv("QUERY_AUDIT_REPEAT_THRESHOLD", 2))
+
+@dataclass(slots = True)
+class AuditedStatement:
+    statement: str
+    parameters: object
+    seconds: float
+
+@dataclass
+class QueryAudit:
+    label: str
+    statements: list = field(default_factory = list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    def slow_statements(self, threshold_ms: float = QUERY_AUDIT_SLOW_MS) -> list:
+        return [statement for statement in self.statements if statement.seconds * 1000 >= threshold_ms]
+
+    def repeated_statements(self, threshold: int = QUERY_AUDIT_REPEAT_THRESHOLD) -> list:
+        # Se compara el SQL sin parámetros: un N+1 repite la misma sentencia con otro id.
+        counts = Counter(statement.statement for statement in self.statements)
+        return [(statement, count) for statement, count in counts.most_common() if count >= threshold]
+
+    def summary(self) -> str:
+        lines = [f"{self.label}: {self.count} queries in {self.seconds * 1000:.1f} ms"]
+        lines += [f"  {statement.seconds * 1000:8.1f} ms  {_one_line(statement.statement)}" for statement in self.statements]
+        return "\n".join(lines)
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+# Auditorías activas en el contexto actual: una petición puede ejecutarse dentro de un
+# query_budget (por ejemplo, con un cliente ASGI en proceso) y ambas deben contarla.
+_active_audits = contextvars.ContextVar("active_audits", default = ())
+
+def _one_line(statement: str, limit: int = 200) -> str:
+    text = " ".join(statement.split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    context._audit_started = time.perf_counter()
+
+def _after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    audits = _active_audits.get()
+    if audits:
+        audited = AuditedStatement(statement, parameters, time.perf_counter() - context._audit_started)
+        for audit in audits:
+            audit.statements.append(audited)
+
+def install_query_audit(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+@contextmanager
+def audit_queries(label: str):
+    audit = QueryAudit(label)
+    token = _active_audits.set(_active_audits.get() + (audit,))
+    try:
+        yield audit
+    finally:
+        _active_audits.reset(token)
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block"):
+    # Falla (AssertionError) si el bloque ejecuta más sentencias de las permitidas.
+    # Uso: with query_budget(2, "GET /api/task/{task_id}"): ...
+    from db.database import async_engine
+    from db.replicas import replicas
+    for audited_engine in [async_engine, *(replica.async_engine for replica in replicas)]:
+        install_query_audit(audited_engine)
+    with audit_queries(label) as audit:
+        yield audit
+    if audit.count > max_queries:
+        raise QueryBudgetExceeded(f"Query budget exceeded ({max_queries}).\n{audit.summary()}")
+
+def report_audit(audit: QueryAudit):
+    # Los parámetros no se escriben: pueden contener tokens o contraseñas.
+    for statement in audit.slow_statements():
+        print(f"Slow query ({statement.seconds * 1000:.1f} ms) in {audit.label}: {_one_line(statement.statement)}")
+    for statement, count in audit.repeated_statements():
+        print(f"Repeated query ({count}x) in {audit.label}: {_one_line(statement)}")
+
+class QueryAuditMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with audit_queries(scope["path"]) as audit:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                # La ruta se conoce cuando el router ya ha resuelto la petición.
+                route = scope.get("route")
+                audit.label = f"{scope['method']} {route.path if route is not None else scope['path']}"
+                report_audit(audit)
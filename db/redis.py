@@ -0,0 +1,78 @@
+import os
+import time
+import redis
+import redis.asyncio as aioredis
+from db.metrics import record_redis_round_trip
+
+# Conexión a Redis.
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+# Conexiones máximas de cada pool (por proceso).
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+
+class InstrumentedConnection(redis.Connection):
+    # Una ida y vuelta va desde que se envía un comando (o un pipeline entero) hasta que
+    # llega la primera respuesta. Las lecturas sin envío previo (pub/sub) no cuentan.
+    _sent_at = None
+
+    def send_packed_command(self, command, check_health = True):
+        self._sent_at = time.perf_counter()
+        return super().send_packed_command(command, check_health)
+
+    def read_response(self, *args, **kwargs):
+        response = super().read_response(*args, **kwargs)
+        if self._sent_at is not None:
+            record_redis_round_trip("sync", time.perf_counter() - self._sent_at)
+            self._sent_at = None
+        return response
+
+class AsyncInstrumentedConnection(aioredis.Connection):
+    _sent_at = None
+
+    async def send_packed_command(self, command, check_health = True):
+        self._sent_at = time.perf_counter()
+        return await super().send_packed_command(command, check_health)
+
+    async def read_response(self, *args, **kwargs):
+        response = await super().read_response(*args, **kwargs)
+        if self._sent_at is not None:
+            record_redis_round_trip("async", time.perf_counter() - self._sent_at)
+            self._sent_at = None
+        return response
+
+# Los pools se crean la primera vez que se piden, no al importar el módulo.
+_pool = None
+_async_pool = None
+
+def get_redis() -> redis.Redis:
+    global _pool
+    if _pool is None:
+        _pool = redis.ConnectionPool(
+            host = REDIS_HOST,
+            port = REDIS_PORT,
+            max_connections = REDIS_MAX_CONNECTIONS,
+            decode_responses = True,
+            connection_class = InstrumentedConnection,
+        )
+    return redis.Redis(connection_pool = _pool)
+
+def get_async_redis() -> aioredis.Redis:
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = aioredis.ConnectionPool(
+            host = REDIS_HOST,
+            port = REDIS_PORT,
+            max_connections = REDIS_MAX_CONNECTIONS,
+            decode_responses = True,
+            connection_class = AsyncInstrumentedConnection,
+        )
+    return aioredis.Redis(connection_pool = _async_pool)
+
+async def close_redis():
+    global _pool, _async_pool
+    if _async_pool is not None:
+        await _async_pool.disconnect()
+        _async_pool = None
+    if _pool is not None:
+        _pool.disconnect()
+        _pool = None
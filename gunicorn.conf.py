@@ -0,0 +1,88 @@
+# Configuración de producción: gunicorn reparte las peticiones entre varios procesos
+# uvicorn. Uso: gunicorn -c gunicorn.conf.py main:app
+# En desarrollo se sigue usando python main.py, con --reload.
+import os
+import shutil
+import tempfile
+
+# La siembra y la actualización del esquema las hace el proceso maestro una sola vez
+# (on_starting), no cada worker. Deben desactivarse antes de que preload_app importe main.
+SEED_ON_STARTUP = os.getenv("SEED_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+UPGRADE_SCHEMA_ON_STARTUP = os.getenv("UPGRADE_SCHEMA_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+os.environ["SEED_ON_STARTUP"] = "false"
+os.environ["UPGRADE_SCHEMA_ON_STARTUP"] = "false"
+
+# Con varios workers, cada uno escribe sus métricas en este directorio y /metrics suma
+# las de todos; sin él, cada scrape vería sólo las del worker que responde. Se vacía
+# aquí, antes de que preload_app importe prometheus_client y cree los ficheros, para
+# no sumar contadores de una ejecución anterior. Cada instancia de gunicorn de la
+# máquina necesita su propio directorio.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "taskmanager-prometheus"))
+shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors = True)
+os.makedirs(PROMETHEUS_MULTIPROC_DIR)
+
+def _available_cpus() -> int:
+    # En un contenedor con límite de CPUs, sched_getaffinity refleja las asignadas.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# Los workers son asíncronos: con uno por CPU se aprovechan todos los núcleos.
+workers = int(os.getenv("WEB_CONCURRENCY", _available_cpus()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Cada worker tiene su propio pool de procesos de bcrypt (auth/hashing.py). Por defecto
+# sería uno por CPU en cada worker, N² procesos en total: se reparten las CPUs entre los
+# workers. Debe fijarse antes de que preload_app importe main.
+os.environ.setdefault("HASHING_WORKERS", str(max(1, _available_cpus() // workers)))
+# La aplicación se importa una vez en el maestro y los workers la heredan al hacer fork.
+preload_app = True
+# Reiniciar cada worker tras N peticiones acota el crecimiento de memoria; el jitter
+# evita que todos se reinicien a la vez.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+# Segundos para terminar las peticiones en curso tras SIGTERM antes de matar al worker.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+def on_starting(server):
+    from seeder import seed_data_if_missing, upgrade_schema
+    seeded = SEED_ON_STARTUP and seed_data_if_missing()
+    if UPGRADE_SCHEMA_ON_STARTUP and not seeded:
+        upgrade_schema()
+
+def when_ready(server):
+    # Cada worker abre su propio pool: avisar si entre todos superan el límite del servidor.
+    from db.database import DB_POOL_SIZE, DB_MAX_OVERFLOW, engine
+    from sqlalchemy import text
+    per_worker = DB_POOL_SIZE + DB_MAX_OVERFLOW
+    try:
+        with engine.connect() as connection:
+            max_connections = int(connection.execute(text("SHOW max_connections")).scalar())
+    except Exception as e:
+        server.log.warning(f"Could not read max_connections: {e}")
+        return
+    finally:
+        engine.dispose()
+    if workers * per_worker > max_connections:
+        server.log.warning(f"{workers} workers x {per_worker} connections exceed max_connections={max_connections}; lower DB_POOL_SIZE/DB_MAX_OVERFLOW.")
+
+def child_exit(server, worker):
+    # Las métricas "live" de los workers que terminan dejan de sumarse.
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el maestro no se pueden compartir entre procesos:
+    # cada worker descarta las heredadas (sin cerrarlas) y crea su propio pool.
+    from db.database import async_engine, engine
+    from db.replicas import replicas
+    engine.dispose(close = False)
+    async_engine.sync_engine.dispose(close = False)
+    for replica in replicas:
+        replica.async_engine.sync_engine.dispose(close = False)
+        replica.check_engine.dispose(close = False)
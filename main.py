@@ -1,16 +1,76 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
-from routes import user, todo_list, task, task_status, auth
-from seeder import seed_data_if_missing
+from routes import user, todo_list, task, task_status, auth, report, health, metrics, profiling
+from seeder import seed_data_if_missing, upgrade_schema
+from db.database import async_engine, engine
+from db.redis import close_redis
+from db.query_audit import QUERY_AUDIT_ENABLED, QueryAuditMiddleware
+from db.replicas import ReadYourWritesMiddleware, dispose_replicas, recent_writers, replica_monitor
+from auth.hashing import shutdown_hashing_executor
+from auth.revocation import revocation_filter
+from crud.report import report_refresher
+from crud.task_events import task_event_hub
 import uvicorn
 
 # Load environment variables from .env file.
 load_dotenv()
 
-app = FastAPI()
+# Sembrar datos de ejemplo si la base de datos está vacía.
+SEED_ON_STARTUP = os.getenv("SEED_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Crear lo que falte del esquema en una base de datos existente (índices, columnas, vistas).
+# Con gunicorn lo hace el proceso maestro una vez y se desactiva en los workers.
+UPGRADE_SCHEMA_ON_STARTUP = os.getenv("UPGRADE_SCHEMA_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importar este módulo no hace E/S: todo lo que necesita la base de datos o Redis
+    # ocurre aquí, una vez por worker, y los pools se crean con la primera petición.
+    app.state.ready = False
+    seeded = SEED_ON_STARTUP and await run_in_threadpool(seed_data_if_missing)
+    # Una base de datos recién sembrada ya tiene el esquema completo.
+    if UPGRADE_SCHEMA_ON_STARTUP and not seeded:
+        await run_in_threadpool(upgrade_schema)
+    # El filtro de revocaciones se sincroniza en segundo plano; mientras tanto se consulta Redis.
+    revocation_filter.start()
+    # Sin DB_REPLICA_URLS no arranca nada y las lecturas van al primario.
+    replica_monitor.start()
+    recent_writers.start()
+    task_event_hub.close_streams_on_exit()
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        # Cierra los streams de eventos abiertos y la conexión LISTEN.
+        await task_event_hub.stop()
+        revocation_filter.stop()
+        replica_monitor.stop()
+        recent_writers.stop()
+        report_refresher.stop()
+        shutdown_hashing_executor()
+        await close_redis()
+        await async_engine.dispose()
+        await dispose_replicas()
+        engine.dispose()
+
+# orjson codifica las respuestas bastante más rápido que el json de la librería estándar.
+app = FastAPI(default_response_class = ORJSONResponse, lifespan = lifespan)
+# Tras una escritura, el cliente lee del primario unos segundos (ver db/replicas.py).
+app.add_middleware(ReadYourWritesMiddleware)
+# Perfilado bajo demanda para admins (X-Profile: 1). Se añade antes que el de métricas
+# para quedar dentro de él y poder leer sus contadores de la petición.
+app.add_middleware(profiling.ProfilingMiddleware)
+# Latencia por ruta y consultas SQL / idas a Redis por petición, publicadas en /metrics.
+app.add_middleware(metrics.MetricsMiddleware)
+# Opcional: avisa de consultas lentas o repetidas en cada petición (QUERY_AUDIT=true).
+if QUERY_AUDIT_ENABLED:
+    app.add_middleware(QueryAuditMiddleware)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl = "/api/auth/login")
 
@@ -23,6 +83,10 @@ app.include_router(todo_list.router, prefix="/api/todo_list", tags=["Todo list"]
 app.include_router(task.router, prefix="/api/task", tags=["Task"])
 app.include_router(task_status.router, prefix="/api/task_status", tags=["Task status"])
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
+app.include_router(report.router, prefix="/api/report", tags=["Report"])
+app.include_router(health.router, prefix="/api/health", tags=["Health"])
+app.include_router(metrics.router, tags=["Metrics"])
+app.include_router(profiling.router, prefix="/api/profile", tags=["Profiling"])
 
 # Manejo de excepciones globales.
 @app.exception_handler(Exception)
@@ -32,8 +96,5 @@ async def global_exception_handler(request: Request, exc: Exception):
         content={"detail": "An unexpected error occurred.", "error": str(exc)},
     )
 
-# Se asegura de que la base de datos tenga información.
-seed_data_if_missing()
-
 if __name__ == "__main__":
     uvicorn.run("main:app", host="localhost", port=8000, reload=True)
@@ -0,0 +1,5 @@
+from sqlmodel import SQLModel
+
+class BulkItemError(SQLModel):
+    index: int  # Posición del elemento en la lista recibida.
+    detail: str
\ No newline at end of file
@@ -0,0 +1,97 @@
+from sqlmodel import SQLModel
+from sqlalchemy import DDL, event
+from typing import Optional
+from datetime import date, datetime
+
+# Vistas materializadas de los informes del panel de administración. Cada una tiene un
+# índice único, necesario para REFRESH MATERIALIZED VIEW CONCURRENTLY.
+REPORT_VIEWS = {
+    # Proporción de tareas completadas de cada lista.
+    "report_list_completion": ("todo_list_id", """
+        SELECT
+            l.id AS todo_list_id,
+            l.title,
+            l.owner_id,
+            count(t.id) AS total,
+            count(t.id) FILTER (WHERE t.is_completed) AS completed,
+            coalesce(count(t.id) FILTER (WHERE t.is_completed)::float / nullif(count(t.id), 0), 0) AS completion_ratio,
+            now() AS refreshed_at
+        FROM todo_list AS l
+        LEFT JOIN task AS t ON t.todo_list_id = l.id
+        GROUP BY l.id
+    """),
+    # Tareas por estado.
+    "report_status_counts": ("status_id", """
+        SELECT
+            s.id AS status_id,
+            s.name,
+            s.color,
+            count(t.id) AS total,
+            count(t.id) FILTER (WHERE NOT t.is_completed) AS open,
+            count(t.id) FILTER (WHERE t.is_completed) AS completed,
+            now() AS refreshed_at
+        FROM task_status AS s
+        LEFT JOIN task AS t ON t.status_id = s.id
+        GROUP BY s.id
+    """),
+    # Tareas abiertas y vencidas de cada usuario (vencidas en el momento del refresco).
+    "report_owner_overdue": ("owner_id", """
+        SELECT
+            u.id AS owner_id,
+            u.name AS owner_name,
+            count(t.id) FILTER (WHERE NOT t.is_completed) AS open,
+            count(t.id) FILTER (WHERE NOT t.is_completed AND t.due_date < now()) AS overdue,
+            now() AS refreshed_at
+        FROM "user" AS u
+        LEFT JOIN todo_list AS l ON l.owner_id = u.id
+        LEFT JOIN task AS t ON t.todo_list_id = l.id
+        GROUP BY u.id
+    """),
+    # Tareas creadas cada día (UTC) y cuántas de ellas están ya completadas.
+    "report_daily_activity": ("day", """
+        SELECT
+            (t.created_at AT TIME ZONE 'UTC')::date AS day,
+            count(*) AS created,
+            count(*) FILTER (WHERE t.is_completed) AS completed,
+            now() AS refreshed_at
+        FROM task AS t
+        GROUP BY 1
+    """),
+}
+
+# Las vistas se crean después de las tablas y se borran antes, porque dependen de ellas.
+for view_name, (unique_column, query) in REPORT_VIEWS.items():
+    event.listen(SQLModel.metadata, "after_create", DDL(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {view_name} AS {query}"))
+    event.listen(SQLModel.metadata, "after_create", DDL(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{view_name} ON {view_name} ({unique_column})"))
+    event.listen(SQLModel.metadata, "before_drop", DDL(f"DROP MATERIALIZED VIEW IF EXISTS {view_name}"))
+
+class ListCompletionReport(SQLModel):
+    todo_list_id: int
+    title: str
+    owner_id: int
+    total: int
+    completed: int
+    completion_ratio: float
+    refreshed_at: datetime
+
+class StatusCountReport(SQLModel):
+    status_id: int
+    name: str
+    color: Optional[str]
+    total: int
+    open: int
+    completed: int
+    refreshed_at: datetime
+
+class OwnerOverdueReport(SQLModel):
+    owner_id: int
+    owner_name: str
+    open: int
+    overdue: int
+    refreshed_at: datetime
+
+class DailyActivityReport(SQLModel):
+    day: date
+    created: int
+    completed: int
+    refreshed_at: datetime
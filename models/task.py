@@ -1,18 +1,96 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Computed, DateTime, Index, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from typing import Optional
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime, timezone, timedelta
+from models.bulk import BulkItemError
 
 class TaskBase(SQLModel):
-    title: str
+    title: str = Field(index = True)
     description: Optional[str]
-    due_date: datetime = Field(default_factory = lambda: datetime.now(timezone.utc) + timedelta(days = 7))
+    due_date: datetime = Field(default_factory = lambda: datetime.now(timezone.utc) + timedelta(days = 7), index = True, sa_type = DateTime(timezone = True))
     is_completed: bool
     todo_list_id: int = Field(foreign_key = "todo_list.id", ondelete = "CASCADE")
     status_id: int = Field(foreign_key = "task_status.id", ondelete = "CASCADE")
 
 class Task(TaskBase, table=True):
+    __table_args__ = (
+        # Tareas de una lista por fecha límite: comprobaciones de propiedad y filtros por fecha.
+        Index("ix_task_todo_list_id_due_date", "todo_list_id", "due_date"),
+        Index("ix_task_status_id", "status_id"),
+        # Índice parcial con sólo las tareas abiertas, que son las que se consultan a diario.
+        Index("ix_task_open_todo_list_id_due_date", "todo_list_id", "due_date", postgresql_where = text("NOT is_completed")),
+    )
     id: Optional[int] = Field(default = None, primary_key = True)
-    created_at: datetime = Field(default_factory = lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory = lambda: datetime.now(timezone.utc), sa_type = DateTime(timezone = True))
+
+# Configuración de texto de la búsqueda; la columna generada y las consultas deben usar la misma.
+TASK_SEARCH_CONFIG = "english"
+
+def _pg_trgm_installed(ddl, target, bind, **kw) -> bool:
+    return bind.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").first() is not None
+
+# Vector de búsqueda de texto completo, calculado por PostgreSQL al escribir la fila (el
+# título pesa más que la descripción). Se añade a la tabla sin mapearlo en el modelo para
+# que no se lea en cada SELECT ni aparezca en las respuestas de la API.
+task_search_vector = Column(
+    "search_vector",
+    TSVECTOR,
+    Computed(
+        f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector('{TASK_SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+        persisted = True,
+    ),
+)
+Task.__table__.append_column(task_search_vector)
+Index("ix_task_search_vector", task_search_vector, postgresql_using = "gin")
+# Trigramas del título para la búsqueda aproximada (errores de escritura). Necesita pg_trgm;
+# si la extensión no está instalada el índice no se crea y la búsqueda aproximada se desactiva.
+Index("ix_task_title_trgm", Task.__table__.c.title, postgresql_using = "gin", postgresql_ops = {"title": "gin_trgm_ops"}).ddl_if(callable_ = _pg_trgm_installed)
+
+class TaskRow(TypedDict):
+    # Fila de lectura ligera para los listados: se serializa tal cual, sin validar un
+    # objeto Task por fila. Mismos campos y orden que la respuesta de Task; con ?fields=
+    # sólo llegan los pedidos, y el id siempre.
+    title: NotRequired[str]
+    description: NotRequired[Optional[str]]
+    due_date: NotRequired[datetime]
+    is_completed: NotRequired[bool]
+    todo_list_id: NotRequired[int]
+    status_id: NotRequired[int]
+    id: int
+    created_at: NotRequired[datetime]
 
 class TaskCreate(TaskBase):
-    pass  # Excluir los campos que no están en la clase base.
\ No newline at end of file
+    pass  # Excluir los campos que no están en la clase base.
+
+class TaskBulkResult(SQLModel):
+    created: list[Task]
+    errors: list[BulkItemError]
+
+class TaskFilter(SQLModel):
+    todo_list_id: Optional[int] = None
+    status_id: Optional[int] = None
+    is_completed: Optional[bool] = None
+    due_after: Optional[datetime] = None
+    due_before: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class TaskBulkValues(SQLModel):
+    status_id: Optional[int] = None
+    is_completed: Optional[bool] = None
+
+class TaskBulkUpdate(SQLModel):
+    filter: TaskFilter
+    values: TaskBulkValues
+
+class TaskBulkChangeResult(SQLModel):
+    count: int
+    ids: list[int]
+
+class TaskCalendarEntry(SQLModel):
+    period: datetime
+    open: int
+    overdue: int
+    completed: int
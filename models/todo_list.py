@@ -1,13 +1,27 @@
 from sqlmodel import SQLModel, Field
 from typing import Optional
+from typing_extensions import NotRequired, TypedDict
+from models.bulk import BulkItemError
 
 class Todo_ListBase(SQLModel):
     title: str
     description: Optional[str]
-    owner_id: int = Field(foreign_key = "user.id", ondelete = "CASCADE")
+    owner_id: int = Field(foreign_key = "user.id", ondelete = "CASCADE", index = True)
 
 class Todo_List(Todo_ListBase, table=True):
     id: Optional[int] = Field(default = None, primary_key = True)
 
+class Todo_ListRow(TypedDict):
+    # Fila de lectura ligera para los listados (mismos campos que Todo_List; con ?fields=
+    # sólo los pedidos y el id).
+    title: NotRequired[str]
+    description: NotRequired[Optional[str]]
+    owner_id: NotRequired[int]
+    id: int
+
 class Todo_ListCreate(Todo_ListBase):
-    pass  # Excluir los campos que no están en la clase base.
\ No newline at end of file
+    pass  # Excluir los campos que no están en la clase base.
+
+class Todo_ListBulkResult(SQLModel):
+    created: list[Todo_List]
+    errors: list[BulkItemError]
\ No newline at end of file
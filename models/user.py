@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional
+from typing_extensions import NotRequired, TypedDict
 from pydantic import EmailStr
 
 class UserBase(SQLModel):
@@ -16,4 +17,12 @@ class UserCreate(UserBase):
     password: str
 
 class UserRead(UserBase):
-    id: int
\ No newline at end of file
+    id: int
+
+class UserRow(TypedDict):
+    # Fila de lectura ligera para los listados: los campos de UserRead, sin credenciales.
+    # Con ?fields= sólo llegan los pedidos y el id.
+    name: NotRequired[str]
+    email: NotRequired[str]
+    role: NotRequired[str]
+    id: int
@@ -0,0 +1,43 @@
+import asyncio
+import os
+from fastapi import APIRouter, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import text
+from db.database import async_engine
+from db.redis import get_async_redis
+from db.replicas import replicas
+
+router = APIRouter()
+
+# Tiempo máximo de cada comprobación de la preparación.
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", 2.0))
+
+async def _check_database():
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+async def _check_redis():
+    await get_async_redis().ping()
+
+async def _run_check(check) -> str:
+    try:
+        await asyncio.wait_for(check(), timeout = HEALTH_CHECK_TIMEOUT_SECONDS)
+        return "ok"
+    except Exception as e:
+        return f"error: {type(e).__name__}"
+
+# Liveness: el proceso responde. No toca la base de datos ni Redis.
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+# Readiness: el arranque ha terminado y las dependencias responden.
+@router.get("/ready")
+async def ready(request: Request):
+    started = getattr(request.app.state, "ready", False)
+    database, redis = await asyncio.gather(_run_check(_check_database), _run_check(_check_redis))
+    checks = {"startup": "ok" if started else "pending", "database": database, "redis": redis}
+    is_ready = all(value == "ok" for value in checks.values())
+    # Las réplicas no afectan a la preparación: si fallan, las lecturas van al primario.
+    replica_status = {replica.name: {"status": replica.status, "lag_seconds": replica.lag_seconds} for replica in replicas}
+    return ORJSONResponse({"status": "ok" if is_ready else "unavailable", "checks": checks, "replicas": replica_status}, status_code = 200 if is_ready else 503)
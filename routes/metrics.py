@@ -0,0 +1,72 @@
+import os
+import time
+from anyio.to_thread import current_default_thread_limiter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest, multiprocess
+from db.metrics import (
+    RequestStats,
+    http_request_duration,
+    http_requests_in_progress,
+    redis_round_trips_per_request,
+    request_stats,
+    sql_seconds_per_request,
+    sql_statements_per_request,
+    threadpool_busy,
+    threadpool_capacity,
+)
+
+router = APIRouter()
+
+# Con gunicorn cada worker escribe sus métricas en este directorio y /metrics las suma.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+# Etiqueta de las peticiones que no corresponden a ninguna ruta (evita una serie por URL).
+UNMATCHED_ROUTE = "unmatched"
+
+class MetricsMiddleware:
+    # Middleware ASGI puro: BaseHTTPMiddleware añadiría una tarea y copias del cuerpo
+    # en cada petición.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        limiter = current_default_thread_limiter()
+        threadpool_busy.set(limiter.borrowed_tokens)
+        threadpool_capacity.set(limiter.total_tokens)
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        http_requests_in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_progress.dec()
+            request_stats.reset(token)
+            # La plantilla de la ruta ("/api/task/{task_id}") y no la URL concreta.
+            route = scope.get("route")
+            route_path = route.path if route is not None else UNMATCHED_ROUTE
+            method = scope["method"]
+            http_request_duration.labels(method, route_path, str(status)).observe(elapsed)
+            sql_statements_per_request.labels(method, route_path).observe(stats.sql_statements)
+            sql_seconds_per_request.labels(method, route_path).observe(stats.sql_seconds)
+            redis_round_trips_per_request.labels(method, route_path).observe(stats.redis_round_trips)
+
+@router.get("/metrics", include_in_schema = False)
+async def metrics():
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type = CONTENT_TYPE_LATEST)
@@ -0,0 +1,204 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from auth.dependencies import get_current_user, require_role
+from db.metrics import request_stats
+
+router = APIRouter()
+
+# Perfilado bajo demanda: un admin añade la cabecera "X-Profile: 1" o "?profile=1" y esa
+# petición se ejecuta con cProfile. Las peticiones sin la marca sólo pagan la comprobación
+# de la cabecera.
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Los perfiles se guardan en disco para que cualquier worker de la máquina pueda servirlos.
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "taskmanager-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_ID_PATTERN = "^[0-9a-f]{32}$"
+# Tiempo propio (sin llamadas hijas) agrupado por la librería donde se gasta. El primer
+# fragmento de ruta que coincida decide la categoría.
+PROFILE_CATEGORIES = [
+    ("orm_hydration", ("/sqlalchemy/orm/", "/sqlmodel/")),
+    ("sql_engine_and_driver", ("/sqlalchemy/", "asyncpg")),
+    ("pydantic_validation", ("/pydantic/", "pydantic_core", "/fastapi/_compat", "/fastapi/encoders", "orjson")),
+    ("bcrypt", ("bcrypt",)),
+    ("redis_client", ("/redis/",)),
+    ("jwt", ("/jose/",)),
+    ("framework", ("/fastapi/", "/starlette/", "/anyio/")),
+    ("asyncio", ("/asyncio/",)),
+]
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_require_admin = require_role(["admin"])
+# cProfile sólo admite un perfil activo por proceso.
+_profiling = False
+
+def _flag_enabled(value) -> bool:
+    return value not in (None, "", "0", "false", "no")
+
+def _profile_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            return _flag_enabled(value.decode("latin-1").lower())
+    query_string = scope.get("query_string", b"")
+    if PROFILE_QUERY_PARAM.encode() not in query_string:
+        return False
+    values = parse_qs(query_string.decode("latin-1"), keep_blank_values = True).get(PROFILE_QUERY_PARAM)
+    return bool(values) and _flag_enabled(values[-1].lower() or "1")
+
+def _bearer_token(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    raise HTTPException(status_code = 401, detail = "Not authenticated.")
+
+def _category(filename: str, function: str) -> str:
+    # Las funciones en C no tienen fichero: el bucle de eventos bloqueado en epoll es
+    # tiempo de espera (SQL, Redis, bcrypt), no CPU.
+    if filename == "~":
+        return "event_loop_wait" if "poll" in function or "select" in function else "builtins"
+    for category, fragments in PROFILE_CATEGORIES:
+        if any(fragment in filename for fragment in fragments):
+            return category
+    if filename.startswith(APP_ROOT):
+        return "application"
+    return "other"
+
+def _profile_path(profile_id: str, extension: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.{extension}")
+
+def _save_profile(profile_id: str, profiler: cProfile.Profile, summary: dict):
+    os.makedirs(PROFILE_DIR, exist_ok = True)
+    stats = pstats.Stats(profiler)
+    self_seconds = {}
+    for (filename, _, function), (_, _, own_seconds, _, _) in stats.stats.items():
+        category = _category(filename, function)
+        self_seconds[category] = self_seconds.get(category, 0.0) + own_seconds
+    summary["self_ms_by_category"] = {category: round(seconds * 1000, 3) for category, seconds in sorted(self_seconds.items(), key = lambda item: -item[1])}
+    text = io.StringIO()
+    stats.stream = text
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    summary["top_functions"] = text.getvalue()
+    stats.dump_stats(_profile_path(profile_id, "prof"))
+    with open(_profile_path(profile_id, "json"), "w") as file:
+        json.dump(summary, file)
+    # Conservar sólo los perfiles más recientes.
+    summaries = sorted((entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")), key = lambda entry: entry.stat().st_mtime, reverse = True)
+    for entry in summaries[PROFILE_KEEP:]:
+        old_id = entry.name.removesuffix(".json")
+        for extension in ("json", "prof"):
+            try:
+                os.remove(_profile_path(old_id, extension))
+            except FileNotFoundError:
+                pass
+
+class ProfilingMiddleware:
+    # Debe quedar dentro de MetricsMiddleware: usa sus contadores de SQL, Redis y bcrypt.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        global _profiling
+        try:
+            await _require_admin(await get_current_user(_bearer_token(scope)))
+            if _profiling:
+                raise HTTPException(status_code = 409, detail = "Another request is being profiled.")
+        except HTTPException as e:
+            await JSONResponse({"detail": e.detail}, status_code = e.status_code)(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        # cProfile mide el hilo del bucle de eventos: si otras peticiones avanzan mientras
+        # esta espera, su código también aparece en el perfil.
+        profiler = cProfile.Profile()
+        _profiling = True
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            wall_seconds = time.perf_counter() - started
+            _profiling = False
+            route = scope.get("route")
+            stats = request_stats.get()
+            summary = {
+                "id": profile_id,
+                "method": scope["method"],
+                "route": route.path if route is not None else None,
+                "path": scope["path"],
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "wall_ms": round(wall_seconds * 1000, 3),
+                # Tiempos de espera medidos fuera del perfil (E/S y procesos de bcrypt).
+                "sql_statements": stats.sql_statements if stats else None,
+                "sql_ms": round(stats.sql_seconds * 1000, 3) if stats else None,
+                "redis_round_trips": stats.redis_round_trips if stats else None,
+                "redis_ms": round(stats.redis_seconds * 1000, 3) if stats else None,
+                "hashing_wait_ms": round(stats.hashing_seconds * 1000, 3) if stats else None,
+            }
+            await run_in_threadpool(_save_profile, profile_id, profiler, summary)
+
+def _load_summary(profile_id: str) -> dict:
+    try:
+        with open(_profile_path(profile_id, "json")) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise HTTPException(status_code = 404, detail = f"Profile {profile_id} not found.")
+
+@router.get("/")
+async def read_all(current_user: dict = Depends(require_role(["admin"]))):
+    def list_profiles():
+        if not os.path.isdir(PROFILE_DIR):
+            return []
+        summaries = []
+        for entry in os.scandir(PROFILE_DIR):
+            if entry.name.endswith(".json"):
+                try:
+                    with open(entry.path) as file:
+                        summary = json.load(file)
+                except (FileNotFoundError, ValueError):
+                    continue
+                summary.pop("top_functions", None)
+                summaries.append(summary)
+        return sorted(summaries, key = lambda summary: summary["started_at"], reverse = True)
+    return await run_in_threadpool(list_profiles)
+
+@router.get("/{profile_id}")
+async def read(profile_id: str = Path(pattern = PROFILE_ID_PATTERN), current_user: dict = Depends(require_role(["admin"]))):
+    return await run_in_threadpool(_load_summary, profile_id)
+
+# Download the raw cProfile data (open it with pstats, snakeviz or gprof2dot for the call tree).
+@router.get("/{profile_id}/download")
+async def download(profile_id: str = Path(pattern = PROFILE_ID_PATTERN), current_user: dict = Depends(require_role(["admin"]))):
+    path = _profile_path(profile_id, "prof")
+    if not os.path.exists(path):
+        raise HTTPException(status_code = 404, detail = f"Profile {profile_id} not found.")
+    return FileResponse(path, media_type = "application/octet-stream", filename = f"{profile_id}.prof")
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from models.report import ListCompletionReport, StatusCountReport, OwnerOverdueReport, DailyActivityReport
+from crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from crud.report import (
+    get_list_completion_report,
+    get_status_count_report,
+    get_owner_overdue_report,
+    get_daily_activity_report,
+    refresh_report_views
+)
+from auth.dependencies import require_role
+from routes.responses import set_next_cursor
+import datetime
+from db.replicas import get_read_session
+
+router = APIRouter()
+
+# Reports are read from materialized views refreshed in the background, so every
+# read costs O(rows in the report), not O(tasks).
+
+@router.get("/list_completion", response_model = list[ListCompletionReport])
+async def list_completion(
+    response: Response,
+    owner_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(require_role(["admin"])),
+):
+    try:
+        rows = await get_list_completion_report(session, owner_id, limit, after)
+        set_next_cursor(response, rows, limit, "todo_list_id")
+        return rows
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/status_counts", response_model = list[StatusCountReport])
+async def status_counts(session: AsyncSession = Depends(get_read_session), current_user: dict = Depends(require_role(["admin"]))):
+    try:
+        return await get_status_count_report(session)
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/owner_overdue", response_model = list[OwnerOverdueReport])
+async def owner_overdue(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(require_role(["admin"])),
+):
+    try:
+        rows = await get_owner_overdue_report(session, limit, after)
+        set_next_cursor(response, rows, limit, "owner_id")
+        return rows
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/daily_activity", response_model = list[DailyActivityReport])
+async def daily_activity(
+    since: Optional[datetime.date] = None,
+    until: Optional[datetime.date] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(require_role(["admin"])),
+):
+    try:
+        return await get_daily_activity_report(session, since, until)
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.post("/refresh")
+async def refresh(current_user: dict = Depends(require_role(["admin"]))):
+    try:
+        # Runs in a worker thread: REFRESH can take a while on large tables.
+        refreshed = await run_in_threadpool(refresh_report_views)
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not refreshed:
+        raise HTTPException(status_code = 409, detail = "A report refresh is already running.")
+    return {"message": "Reports refreshed."}
@@ -0,0 +1,85 @@
+from functools import lru_cache
+from typing import Optional
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from db.replicas import read_session
+from crud.cache import ResponseCache
+from crud.pagination import stream_rows
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Los resultados ordenados por relevancia se paginan por desplazamiento, no por id.
+NEXT_OFFSET_HEADER = "X-Next-Offset"
+# Número de filas que se agrupan en cada trozo enviado al cliente.
+NDJSON_CHUNK_ROWS = 500
+# Las respuestas cacheadas dependen del usuario autenticado; el cliente debe revalidar siempre.
+CACHED_RESPONSE_CACHE_CONTROL = "private, no-cache"
+
+def set_next_cursor(response: Response, rows: list, limit: int, key: str = "id"):
+    # Si la página está llena puede haber más filas: el cliente pide la siguiente
+    # pasando este valor en el parámetro "after".
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = str(last[key] if isinstance(last, dict) else getattr(last, key))
+
+def rows_response(rows: list, row_type) -> Response:
+    # Camino rápido: las filas se serializan en un solo paso con un TypeAdapter cacheado.
+    # Al devolver un Response, FastAPI no valida otra vez contra response_model, que
+    # queda sólo para la documentación.
+    return Response(_list_adapter(row_type).dump_json(rows), media_type = "application/json")
+
+def row_response(row: dict, row_type) -> Response:
+    # Una sola fila por el mismo camino que rows_response.
+    return Response(_row_adapter(row_type).dump_json(row), media_type = "application/json")
+
+def set_next_offset(response: Response, rows: list, limit: int, offset: int):
+    if rows and len(rows) == limit:
+        response.headers[NEXT_OFFSET_HEADER] = str(offset + limit)
+
+def ndjson_response(request: Request, statement, row_type):
+    # La sesión se abre dentro del generador porque la de Depends(get_read_session)
+    # se cierra antes de que StreamingResponse empiece a enviar el cuerpo; se elige igual,
+    # en una réplica si se puede. Las filas se serializan con el tipo de fila del
+    # listado, así que sólo salen sus columnas.
+    adapter = _row_adapter(row_type)
+    async def iter_chunks():
+        async with read_session(request) as session:
+            lines = []
+            async for row in stream_rows(session, statement):
+                lines.append(adapter.dump_json(row).decode())
+                if len(lines) >= NDJSON_CHUNK_ROWS:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+    return StreamingResponse(iter_chunks(), media_type = NDJSON_MEDIA_TYPE)
+
+@lru_cache(maxsize = None)
+def _row_adapter(row_type) -> TypeAdapter:
+    return TypeAdapter(row_type)
+
+@lru_cache(maxsize = None)
+def _list_adapter(model) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: se ignora el prefijo W/.
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+async def cached_list_response(request: Request, cache: ResponseCache, model, load_rows, session) -> Response:
+    # Con la caché llena no se toca la base de datos; si además el ETag coincide
+    # se responde 304 sin cuerpo.
+    entry = cache.get()
+    if entry is None:
+        version = cache.version
+        rows = await load_rows(session)
+        entry = cache.store(version, _list_adapter(model).dump_json(rows))
+    headers = {"ETag": entry.etag, "Cache-Control": CACHED_RESPONSE_CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code = 304, headers = headers)
+    return Response(entry.body, media_type = "application/json", headers = headers)
@@ -1,69 +1,301 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
-from db.database import get_session
-from models.task import Task, TaskCreate
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Literal, Optional
+from db.database import get_async_session
+from db.replicas import get_read_session
+from models.task import Task, TaskCreate, TaskBulkResult, TaskFilter, TaskBulkUpdate, TaskBulkChangeResult, TaskCalendarEntry, TaskRow
+from crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from crud.bulk import BULK_MAX_ITEMS
+from crud.task_events import task_event_hub
 from crud.task import (
     create_task,
+    create_tasks_bulk,
+    update_tasks_by_filter,
+    delete_tasks_by_filter,
     get_tasks,
-    get_task_by_id,
+    stream_tasks_statement,
+    get_task_with_owner_name,
+    get_tasks_by_owner,
+    search_tasks,
+    SEARCH_MAX_OFFSET,
+    SEARCH_MAX_QUERY_LENGTH,
     get_tasks_by_title,
     get_tasks_by_due_date,
+    get_tasks_by_completed,
+    get_task_calendar,
+    utc_day_start,
+    CALENDAR_MAX_DAYS,
     update_task,
     delete_task
 )
-from auth.dependencies import require_role, get_current_user
-from crud.todo_list import (
-    get_todo_list_by_id
-)
-from crud.user import (
-    get_user_by_id
-)
+from auth.dependencies import require_role, get_current_user, oauth2_scheme
+from auth.jwt import verify_access_token
+from routes.responses import ndjson_response, row_response, rows_response, set_next_cursor, set_next_offset
+from sqlalchemy.exc import IntegrityError
+import asyncio
 import datetime
+import time
 
 router = APIRouter()
 
+# Un comentario cada cierto tiempo mantiene abierta la conexión a través de proxies.
+TASK_EVENTS_HEARTBEAT_SECONDS = 15
+TASK_EVENTS_RETRY_MS = 3000
+TOKEN_EXPIRED_MESSAGE = "event: token_expired\ndata: {}\n\n"
+
 @router.post("/", response_model = Task)
-def create(task: TaskCreate, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin"]))):
+async def create(task: TaskCreate, session: AsyncSession = Depends(get_async_session), current_task: dict = Depends(require_role(["admin"]))):
     try:
         task_data = Task(**task.model_dump())
-        return create_task(session, task_data)
+        return await create_task(session, task_data)
     except ValueError as e:
         raise HTTPException(status_code = 400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/", response_model = list[Task])
-def read_all(session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin"]))):
+@router.post("/bulk", response_model = TaskBulkResult)
+async def create_bulk(
+    tasks: list[dict] = Body(
+        ...,
+        examples=[
+            [
+                {
+                    "title": "Imported task",
+                    "description": "Imported task description",
+                    "due_date": "2025-01-01 00:00:00.000000",
+                    "is_completed": False,
+                    "todo_list_id": 1,
+                    "status_id": 1
+                }
+            ]
+        ]
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_task: dict = Depends(require_role(["admin"])),
+):
+    if len(tasks) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code = 413, detail = f"At most {BULK_MAX_ITEMS} tasks per request.")
     try:
-        return get_tasks(session)
+        # Valid tasks are inserted in one transaction; invalid ones are reported by index.
+        created, errors = await create_tasks_bulk(session, tasks)
+        return TaskBulkResult(created = created, errors = errors)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/{task_id}", response_model = Task)
-def read(task_id: int, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.put("/bulk", response_model = TaskBulkChangeResult)
+async def update_bulk(
+    bulk_update: TaskBulkUpdate = Body(
+        ...,
+        examples=[
+            {
+                "filter": {"todo_list_id": 1},
+                "values": {"status_id": 2, "is_completed": True}
+            }
+        ]
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_task: dict = Depends(require_role(["admin", "user"])),
+):
+    task_data = bulk_update.values.model_dump(exclude_none = True)
+    if not bulk_update.filter.model_dump(exclude_none = True):
+        raise HTTPException(status_code = 400, detail = "At least one filter is required.")
+    if not task_data:
+        raise HTTPException(status_code = 400, detail = "At least one value to update is required.")
+    # If not admin, only tasks in the user's own todo lists are updated.
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
     try:
-        task = get_task_by_id(session, task_id)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
-        # If not admin, can't see tasks if not an owner.
-        todo_list = get_todo_list_by_id(task.get("todo_list_id"))
-        if not todo_list:
-            raise HTTPException(status_code = 403, detail = "No todo list found for that task.")
-        current_user = get_current_user()
-        if current_user.get("role") != "admin":
-            user = get_user_by_id(todo_list.owner_id)
-            if not user:
-                raise HTTPException(status_code = 403, detail = "Error finding user corresponding to the task's todo list.")
-            if user.id != current_user.id:
-                raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        return task
+        task_ids = await update_tasks_by_filter(session, bulk_update.filter, task_data, owner_name)
+        return TaskBulkChangeResult(count = len(task_ids), ids = task_ids)
+    except IntegrityError:
+        raise HTTPException(status_code = 400, detail = "Invalid values for the selected tasks.")
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.delete("/bulk", response_model = TaskBulkChangeResult)
+async def delete_bulk(
+    task_filter: TaskFilter = Body(
+        ...,
+        examples=[
+            {"is_completed": True, "created_before": "2025-01-01 00:00:00.000000"}
+        ]
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_task: dict = Depends(require_role(["admin", "user"])),
+):
+    if not task_filter.model_dump(exclude_none = True):
+        raise HTTPException(status_code = 400, detail = "At least one filter is required.")
+    # If not admin, only tasks in the user's own todo lists are deleted.
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
+    try:
+        task_ids = await delete_tasks_by_filter(session, task_filter, owner_name)
+        return TaskBulkChangeResult(count = len(task_ids), ids = task_ids)
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/", response_model = list[TaskRow])
+async def read_all(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    stream: bool = False,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_task: dict = Depends(require_role(["admin"])),
+):
+    try:
+        # With stream=true every task after the cursor is sent as NDJSON.
+        if stream:
+            return ndjson_response(request, stream_tasks_statement(after, fields), TaskRow)
+        tasks = await get_tasks(session, limit, after, fields)
+        response = rows_response(tasks, TaskRow)
+        set_next_cursor(response, tasks, limit)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/mine", response_model = list[TaskRow])
+async def read_mine(
+    title: Optional[str] = None,
+    due_date: Optional[datetime.date] = None,
+    due_after: Optional[datetime.datetime] = None,
+    due_before: Optional[datetime.datetime] = None,
+    completed: Optional[bool] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_task: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
+    try:
+        # Tasks in the caller's todo lists, resolved with one joined query.
+        tasks = await get_tasks_by_owner(
+            session,
+            current_task.get("name"),
+            title = title,
+            due_date = due_date,
+            due_after = due_after,
+            due_before = due_before,
+            completed = completed,
+            limit = limit,
+            after = after,
+            fields = fields,
+        )
+        response = rows_response(tasks, TaskRow)
+        set_next_cursor(response, tasks, limit)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/calendar", response_model = list[TaskCalendarEntry])
+async def calendar(
+    due_after: Optional[datetime.date] = None,
+    due_before: Optional[datetime.date] = None,
+    granularity: Literal["day", "week"] = "day",
+    session: AsyncSession = Depends(get_read_session),
+    current_task: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
+    # Defaults to the next 30 days; due_before is exclusive.
+    if due_after is None:
+        due_after = datetime.datetime.now(datetime.timezone.utc).date()
+    if due_before is None:
+        due_before = due_after + datetime.timedelta(days = 30)
+    if due_before <= due_after:
+        raise HTTPException(status_code = 400, detail = "due_before must be later than due_after.")
+    if (due_before - due_after).days > CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code = 400, detail = f"The range can span at most {CALENDAR_MAX_DAYS} days.")
+    try:
+        # Open, overdue and completed counts of the caller's tasks per day or week.
+        return await get_task_calendar(session, current_task.get("name"), utc_day_start(due_after), utc_day_start(due_before), granularity)
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/search", response_model = list[Task])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length = 1, max_length = SEARCH_MAX_QUERY_LENGTH),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    offset: int = Query(0, ge = 0, le = SEARCH_MAX_OFFSET),
+    session: AsyncSession = Depends(get_read_session),
+    current_task: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
+    try:
+        # Ranked full-text search over the caller's tasks, with a fuzzy fallback for typos.
+        tasks = await search_tasks(session, q, current_task.get("name"), limit, offset)
+        set_next_offset(response, tasks, limit, offset)
+        return tasks
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+# Server-Sent Events with the changes to the caller's tasks (all tasks for admins).
+# Events carry ids only; on "resync" or ids = null the client reloads its tasks.
+# The stream ends with a "token_expired" event once the token expires or is revoked;
+# the client reconnects with a fresh token.
+@router.get("/events")
+async def events(token: str = Depends(oauth2_scheme), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
+    expires_at = current_task.get("exp", 0)
+
+    async def iter_events():
+        queue = task_event_hub.subscribe(owner_name)
+        try:
+            yield f"retry: {TASK_EVENTS_RETRY_MS}\n\n"
+            while True:
+                # Wake up at the next heartbeat or when the token expires, whichever is first.
+                timeout = min(TASK_EVENTS_HEARTBEAT_SECONDS, expires_at - time.time())
+                try:
+                    message = await asyncio.wait_for(queue.get(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    # Re-check expiry and revocation on every heartbeat.
+                    if time.time() >= expires_at or await verify_access_token(token) is None:
+                        yield TOKEN_EXPIRED_MESSAGE
+                        return
+                    message = ": heartbeat\n\n"
+                if message is None:
+                    return
+                if time.time() >= expires_at:
+                    yield TOKEN_EXPIRED_MESSAGE
+                    return
+                yield message
+        finally:
+            task_event_hub.unsubscribe(owner_name, queue)
+
+    return StreamingResponse(
+        iter_events(),
+        media_type = "text/event-stream",
+        headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{task_id}", response_model = TaskRow)
+async def read(
+    task_id: int,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_task: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
+    try:
+        # The task and the name of its todo list's owner come from one query.
+        row = await get_task_with_owner_name(session, task_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not row:
+        raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
+    task, owner_name = row
+    # If not admin, can't see tasks if not an owner.
+    if current_task.get("role") != "admin" and owner_name != current_task.get("name"):
+        raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
+    return row_response(task, TaskRow)
 
 @router.get("/title/{title}", response_model = Task)
-def read_by_name(title: str, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+async def read_by_name(title: str, session: AsyncSession = Depends(get_read_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
     try:
-        task = get_tasks_by_title(session, title)
+        task = await get_tasks_by_title(session, title)
         if not task:
             raise HTTPException(status_code = 404, detail = f"Task with title '{title}' not found.")
         # If not admin, can't see tasks if not an owner.
@@ -76,34 +308,26 @@ def read_by_name(title: str, session: Session = Depends(get_session), current_ta
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/due_date/{due_date}", response_model = Task)
-def read_by_due_date(due_date: datetime.date, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.get("/due_date/{due_date}", response_model = list[Task])
+async def read_by_due_date(due_date: datetime.date, session: AsyncSession = Depends(get_read_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+    # If not admin, only tasks in the user's own todo lists are returned.
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
     try:
-        task = get_tasks_by_due_date(session, due_date)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task with due date '{due_date}' not found.")
-        # If not admin, can't see tasks if not an owner.
-        if current_task.get("role") != "admin" and current_task.get("due_date") != task.due_date:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        return task
+        return await get_tasks_by_due_date(session, due_date, owner_name)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/completed/{completed}", response_model = Task)
-def read_by_completed(completed: bool, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.get("/completed/{completed}", response_model = list[Task])
+async def read_by_completed(completed: bool, session: AsyncSession = Depends(get_read_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+    # If not admin, only tasks in the user's own todo lists are returned.
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
     try:
-        task = get_tasks_by_due_date(session, completed)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task with completed status '{completed}' not found.")
-        # If not admin, can't see tasks if not an owner.
-        if current_task.get("role") != "admin" and current_task.get("completed") != task.completed:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        return task
+        return await get_tasks_by_completed(session, completed, owner_name)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
 @router.put("/{task_id}", response_model = Task)
-def update(
+async def update(
     task_id: int,
     task_data: dict = Body(
         ...,
@@ -114,41 +338,37 @@ def update(
                     "title": "Updated task title",
                     "description": "Updated task description",
                     "due_date": "2025-01-01 00:00:00.000000",
-                    "completed": False,
+                    "is_completed": False,
                     "status_id": 1
                 }
             }
         }
     ),
-    session: Session = Depends(get_session),
-    current_task: dict = Depends(require_role(["admin", "user", "viewer"])),
+    session: AsyncSession = Depends(get_async_session),
+    current_task: dict = Depends(require_role(["admin", "user"])),
 ):
+    # If not admin, only tasks in the user's own todo lists can be changed.
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
     try:
-        task = get_task_by_id(session, task_id)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
-        # If not admin, can't change tasks if not an owner.
-        if current_task.get("role") != "admin" and current_task.get("name") != task.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        updated_task = update_task(session, task_id, task_data)
-        if not updated_task:
-            raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
-        return updated_task
+        updated_task = await update_task(session, task_id, task_data, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not updated_task:
+        raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
+    return updated_task
 
 @router.delete("/{task_id}", response_model = Task)
-def delete(task_id: int, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user", "viewer"]))):
+async def delete(task_id: int, session: AsyncSession = Depends(get_async_session), current_task: dict = Depends(require_role(["admin", "user"]))):
+    # If not admin, only tasks in the user's own todo lists can be deleted.
+    owner_name = None if current_task.get("role") == "admin" else current_task.get("name")
     try:
-        task = get_task_by_id(session, task_id)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
-        # If not admin, can't see tasks if not an owner.
-        if current_task.get("role") != "admin" and current_task.get("name") != task.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        deleted_task = delete_task(session, task_id)
-        if not deleted_task:
-            raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
-        return deleted_task
+        deleted_task = await delete_task(session, task_id, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
-        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not deleted_task:
+        raise HTTPException(status_code = 404, detail = f"Task with ID {task_id} not found.")
+    return deleted_task
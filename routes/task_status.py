@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
-from db.database import get_session
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.database import get_async_session
+from db.replicas import get_read_session
 from models.task_status import Task_Status, Task_StatusCreate
 from crud.task_status import (
     create_task_status,
     get_task_statuses,
     get_task_status_by_id,
+    task_statuses_cache,
     update_task_status,
     delete_task_status
 )
@@ -16,37 +18,41 @@ from crud.todo_list import (
 from crud.user import (
     get_user_by_id
 )
+from routes.responses import cached_list_response
 
 router = APIRouter()
 
 @router.post("/", response_model = Task_Status)
-def create(task: Task_StatusCreate, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin"]))):
+async def create(task: Task_StatusCreate, session: AsyncSession = Depends(get_async_session), current_task: dict = Depends(require_role(["admin"]))):
     try:
         task_data = Task_Status(**task.model_dump())
-        return create_task_status(session, task_data)
+        return await create_task_status(session, task_data)
     except ValueError as e:
         raise HTTPException(status_code = 400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
 @router.get("/", response_model = list[Task_Status])
-def read_all(session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user"]))):
+async def read_all(request: Request, session: AsyncSession = Depends(get_async_session), current_task: dict = Depends(require_role(["admin", "user"]))):
     try:
-        return get_task_statuses(session)
+        # Served from the in-process cache; 304 when the client's ETag is current.
+        # Filled from the primary: a lagging replica could cache stale rows right after a write.
+        return await cached_list_response(request, task_statuses_cache, Task_Status, get_task_statuses, session)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
 @router.get("/{task_id}", response_model = Task_Status)
-def read(task_id: int, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin", "user"]))):
+async def read(task_id: int, session: AsyncSession = Depends(get_read_session), current_task: dict = Depends(require_role(["admin", "user"]))):
     try:
-        task_status = get_task_status_by_id(session, task_id)
-        if not task_status:
-            raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
+        task_status = await get_task_status_by_id(session, task_id)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not task_status:
+        raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
+    return task_status
 
 @router.put("/{task_id}", response_model = Task_Status)
-def update(
+async def update(
     task_id: int,
     task_data: dict = Body(
         ...,
@@ -60,35 +66,27 @@ def update(
             }
         }
     ),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_task: dict = Depends(require_role(["admin"])),
 ):
     try:
-        task = get_task_status_by_id(session, task_id)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
-        # If not admin, can't change tasks if not an owner.
-        if current_task.get("role") != "admin" and current_task.get("name") != task.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        updated_task = update_task_status(session, task_id, task_data)
-        if not updated_task:
-            raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
-        return updated_task
+        updated_task = await update_task_status(session, task_id, task_data)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not updated_task:
+        raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
+    return updated_task
 
 @router.delete("/{task_id}", response_model = Task_Status)
-def delete(task_id: int, session: Session = Depends(get_session), current_task: dict = Depends(require_role(["admin"]))):
+async def delete(task_id: int, session: AsyncSession = Depends(get_async_session), current_task: dict = Depends(require_role(["admin"]))):
     try:
-        task = get_task_status_by_id(session, task_id)
-        if not task:
-            raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
-        # If not admin, can't see tasks if not an owner.
-        if current_task.get("role") != "admin" and current_task.get("name") != task.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        deleted_task = delete_task_status(session, task_id)
-        if not deleted_task:
-            raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
-        return deleted_task
+        deleted_task = await delete_task_status(session, task_id)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
-        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not deleted_task:
+        raise HTTPException(status_code = 404, detail = f"Task status with ID {task_id} not found.")
+    return deleted_task
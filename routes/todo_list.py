@@ -1,53 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
-from db.database import get_session
-from models.todo_list import Todo_List, Todo_ListCreate
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from db.database import get_async_session
+from db.replicas import get_read_session
+from models.todo_list import Todo_List, Todo_ListCreate, Todo_ListBulkResult, Todo_ListRow
+from crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from crud.bulk import BULK_MAX_ITEMS
 from crud.todo_list import (
     create_todo_list,
+    create_todo_lists_bulk,
     get_todo_lists,
-    get_todo_list_by_id,
+    stream_todo_lists_statement,
+    get_todo_list_with_owner_name,
+    get_todo_lists_by_owner,
     get_todo_list_by_name,
     update_todo_list,
     delete_todo_list
 )
 from auth.dependencies import require_role
+from routes.responses import ndjson_response, row_response, rows_response, set_next_cursor
 
 router = APIRouter()
 
 @router.post("/", response_model = Todo_List)
-def create(todo_list: Todo_ListCreate, session: Session = Depends(get_session), current_todo_list: dict = Depends(require_role("admin"))):
+async def create(todo_list: Todo_ListCreate, session: AsyncSession = Depends(get_async_session), current_todo_list: dict = Depends(require_role("admin"))):
     try:
         todo_list_data = Todo_List(**todo_list.model_dump())
-        return create_todo_list(session, todo_list_data)
+        return await create_todo_list(session, todo_list_data)
     except ValueError as e:
         raise HTTPException(status_code = 400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/", response_model = list[Todo_List])
-def read_all(session: Session = Depends(get_session), current_todo_list: dict = Depends(require_role("admin"))):
+@router.post("/bulk", response_model = Todo_ListBulkResult)
+async def create_bulk(
+    todo_lists: list[dict] = Body(
+        ...,
+        examples=[
+            [
+                {
+                    "title": "Imported todo_list",
+                    "description": "Imported todo_list description",
+                    "owner_id": 1
+                }
+            ]
+        ]
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    current_todo_list: dict = Depends(require_role("admin")),
+):
+    if len(todo_lists) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code = 413, detail = f"At most {BULK_MAX_ITEMS} todo lists per request.")
     try:
-        return get_todo_lists(session)
+        # Valid todo lists are inserted in one transaction; invalid ones are reported by index.
+        created, errors = await create_todo_lists_bulk(session, todo_lists)
+        return Todo_ListBulkResult(created = created, errors = errors)
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/{todo_list_id}", response_model = Todo_List)
-def read(todo_list_id: int, session: Session = Depends(get_session), current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.get("/", response_model = list[Todo_ListRow])
+async def read_all(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    stream: bool = False,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_todo_list: dict = Depends(require_role("admin")),
+):
     try:
-        todo_list = get_todo_list_by_id(session, todo_list_id)
-        if not todo_list:
-            raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
-        # If not admin, can't see todo_lists if not an owner.
-        if current_todo_list.get("role") != "admin" and current_todo_list.get("name") != todo_list.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        return todo_list
+        # With stream=true every todo list after the cursor is sent as NDJSON.
+        if stream:
+            return ndjson_response(request, stream_todo_lists_statement(after, fields), Todo_ListRow)
+        todo_lists = await get_todo_lists(session, limit, after, fields)
+        response = rows_response(todo_lists, Todo_ListRow)
+        set_next_cursor(response, todo_lists, limit)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
+@router.get("/mine", response_model = list[Todo_ListRow])
+async def read_mine(
+    title: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
+    try:
+        # Todo lists owned by the caller, resolved with one joined query.
+        todo_lists = await get_todo_lists_by_owner(session, current_todo_list.get("name"), title, limit, after, fields)
+        response = rows_response(todo_lists, Todo_ListRow)
+        set_next_cursor(response, todo_lists, limit)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+
+@router.get("/{todo_list_id}", response_model = Todo_ListRow)
+async def read(
+    todo_list_id: int,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
+    try:
+        row = await get_todo_list_with_owner_name(session, todo_list_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
+    except Exception as e:
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not row:
+        raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
+    todo_list, owner_name = row
+    # If not admin, can't see todo_lists if not an owner.
+    if current_todo_list.get("role") != "admin" and owner_name != current_todo_list.get("name"):
+        raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
+    return row_response(todo_list, Todo_ListRow)
+
 @router.get("/name/{name}", response_model = Todo_List)
-def read_by_name(name: str, session: Session = Depends(get_session), current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"]))):
+async def read_by_name(name: str, session: AsyncSession = Depends(get_read_session), current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"]))):
     try:
-        todo_list = get_todo_list_by_name(session, name)
+        todo_list = await get_todo_list_by_name(session, name)
         if not todo_list:
             raise HTTPException(status_code = 404, detail = f"Todo_List with name '{name}' not found.")
         # If not admin, can't see todo_lists if not an owner.
@@ -58,7 +136,7 @@ def read_by_name(name: str, session: Session = Depends(get_session), current_tod
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
 @router.put("/{todo_list_id}", response_model = Todo_List)
-def update(
+async def update(
     todo_list_id: int,
     todo_list_data: dict = Body(
         ...,
@@ -73,35 +151,31 @@ def update(
             }
         }
     ),
-    session: Session = Depends(get_session),
-    current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"])),
+    session: AsyncSession = Depends(get_async_session),
+    current_todo_list: dict = Depends(require_role(["admin", "user"])),
 ):
+    # If not admin, only the user's own todo lists can be changed.
+    owner_name = None if current_todo_list.get("role") == "admin" else current_todo_list.get("name")
     try:
-        todo_list = get_todo_list_by_id(session, todo_list_id)
-        if not todo_list:
-            raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
-        # If not admin, can't change todo_lists if not an owner.
-        if current_todo_list.get("role") != "admin" and current_todo_list.get("name") != todo_list.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        updated_todo_list = update_todo_list(session, todo_list_id, todo_list_data)
-        if not updated_todo_list:
-            raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
-        return updated_todo_list
+        updated_todo_list = await update_todo_list(session, todo_list_id, todo_list_data, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not updated_todo_list:
+        raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
+    return updated_todo_list
 
 @router.delete("/{todo_list_id}", response_model = Todo_List)
-def delete(todo_list_id: int, session: Session = Depends(get_session), current_todo_list: dict = Depends(require_role(["admin", "user", "viewer"]))):
+async def delete(todo_list_id: int, session: AsyncSession = Depends(get_async_session), current_todo_list: dict = Depends(require_role(["admin", "user"]))):
+    # If not admin, only the user's own todo lists can be deleted.
+    owner_name = None if current_todo_list.get("role") == "admin" else current_todo_list.get("name")
     try:
-        todo_list = get_todo_list_by_id(session, todo_list_id)
-        if not todo_list:
-            raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
-        # If not admin, can't see todo_lists if not an owner.
-        if current_todo_list.get("role") != "admin" and current_todo_list.get("name") != todo_list.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        deleted_todo_list = delete_todo_list(session, todo_list_id)
-        if not deleted_todo_list:
-            raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
-        return deleted_todo_list
+        deleted_todo_list = await delete_todo_list(session, todo_list_id, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
-        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not deleted_todo_list:
+        raise HTTPException(status_code = 404, detail = f"Todo_List with ID {todo_list_id} not found.")
+    return deleted_todo_list
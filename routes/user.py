@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlmodel import Session
-from db.database import get_session
-from models.user import User, UserCreate
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Optional
+from db.database import get_async_session
+from db.replicas import get_read_session
+from models.user import User, UserCreate, UserRead, UserRow
+from crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from crud.user import (
     create_user,
     get_users,
-    get_user_by_id,
+    stream_users_statement,
+    get_user_row_with_name,
     get_user_by_name,
     update_user,
     update_user_by_name,
@@ -13,43 +17,68 @@ from crud.user import (
     delete_user_by_name,
 )
 from auth.dependencies import require_role
+from routes.responses import ndjson_response, row_response, rows_response, set_next_cursor
 
 router = APIRouter()
 
-@router.post("/", response_model = User)
-def create(user: UserCreate, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+@router.post("/", response_model = UserRead)
+async def create(user: UserCreate, session: AsyncSession = Depends(get_async_session), current_user: dict = Depends(require_role("admin"))):
     try:
         user_data = User(**user.model_dump())
-        return create_user(session, user_data)
+        return await create_user(session, user_data)
     except ValueError as e:
         raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/", response_model = list[User])
-def read_all(session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+@router.get("/", response_model = list[UserRow])
+async def read_all(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge = 1, le = MAX_PAGE_SIZE),
+    after: Optional[int] = None,
+    stream: bool = False,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(require_role("admin")),
+):
     try:
-        return get_users(session)
+        # With stream=true every user after the cursor is sent as NDJSON.
+        if stream:
+            return ndjson_response(request, stream_users_statement(after, fields), UserRow)
+        users = await get_users(session, limit, after, fields)
+        response = rows_response(users, UserRow)
+        set_next_cursor(response, users, limit)
+        return response
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.get("/{user_id}", response_model = User)
-def read(user_id: int, session: Session = Depends(get_session), current_user: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.get("/{user_id}", response_model = UserRow)
+async def read(
+    user_id: int,
+    fields: Optional[str] = Query(None, description = "Comma-separated fields to return; id is always included."),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: dict = Depends(require_role(["admin", "user", "viewer"])),
+):
     try:
-        user = get_user_by_id(session, user_id)
-        if not user:
-            raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
-        # If not admin, can't see users if not an owner.
-        if current_user.get("role") != "admin" and current_user.get("name") != user.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        return user
+        row = await get_user_row_with_name(session, user_id, fields)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not row:
+        raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
+    user, name = row
+    # If not admin, can't see users if not an owner.
+    if current_user.get("role") != "admin" and current_user.get("name") != name:
+        raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
+    return row_response(user, UserRow)
 
-@router.get("/name/{name}", response_model = User)
-def read_by_name(name: str, session: Session = Depends(get_session), current_user: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.get("/name/{name}", response_model = UserRead)
+async def read_by_name(name: str, session: AsyncSession = Depends(get_read_session), current_user: dict = Depends(require_role(["admin", "user", "viewer"]))):
     try:
-        user = get_user_by_name(session, name)
+        user = await get_user_by_name(session, name)
         if not user:
             raise HTTPException(status_code = 404, detail = f"User with name '{name}' not found.")
         # If not admin, can't see users if not an owner.
@@ -59,8 +88,8 @@ def read_by_name(name: str, session: Session = Depends(get_session), current_use
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
 
-@router.put("/{user_id}", response_model = User)
-def update(
+@router.put("/{user_id}", response_model = UserRead)
+async def update(
     user_id: int,
     user_data: dict = Body(
         ...,
@@ -74,25 +103,23 @@ def update(
             }
         }
     ),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: dict = Depends(require_role(["admin", "user", "viewer"])),
 ):
+    # If not admin, users can only change themselves.
+    owner_name = None if current_user.get("role") == "admin" else current_user.get("name")
     try:
-        user = get_user_by_id(session, user_id)
-        if not user:
-            raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
-        # If not admin, can't change users if not an owner.
-        if current_user.get("role") != "admin" and current_user.get("name") != user.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        updated_user = update_user(session, user_id, user_data)
-        if not updated_user:
-            raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
-        return updated_user
+        updated_user = await update_user(session, user_id, user_data, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not updated_user:
+        raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
+    return updated_user
 
-@router.put("/name/{name}", response_model = User)
-def update_by_name(
+@router.put("/name/{name}", response_model = UserRead)
+async def update_by_name(
     name: str,
     user_data: dict = Body(
         ...,
@@ -106,51 +133,45 @@ def update_by_name(
             }
         }
     ),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: dict = Depends(require_role(["admin", "user", "viewer"])),
 ):
+    # If not admin, users can only change themselves.
+    owner_name = None if current_user.get("role") == "admin" else current_user.get("name")
     try:
-        user = get_user_by_name(session, name)
-        if not user:
-            raise HTTPException(status_code = 404, detail = f"User with name {name} not found.")
-        # If not admin, can't change users if not an owner.
-        if current_user.get("role") != "admin" and current_user.get("name") != user.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        updated_user = update_user_by_name(session, name, user_data)
-        if not updated_user:
-            raise HTTPException(status_code = 404, detail = f"User with name '{name}' not found.")
-        return updated_user
+        updated_user = await update_user_by_name(session, name, user_data, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not updated_user:
+        raise HTTPException(status_code = 404, detail = f"User with name '{name}' not found.")
+    return updated_user
 
-@router.delete("/{user_id}", response_model = User)
-def delete(user_id: int, session: Session = Depends(get_session), current_user: dict = Depends(require_role(["admin", "user", "viewer"]))):
+@router.delete("/{user_id}", response_model = UserRead)
+async def delete(user_id: int, session: AsyncSession = Depends(get_async_session), current_user: dict = Depends(require_role(["admin", "user", "viewer"]))):
+    # If not admin, users can only delete themselves.
+    owner_name = None if current_user.get("role") == "admin" else current_user.get("name")
     try:
-        user = get_user_by_id(session, user_id)
-        if not user:
-            raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
-        # If not admin, can't see users if not an owner.
-        if current_user.get("role") != "admin" and current_user.get("name") != user.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        deleted_user = delete_user(session, user_id)
-        if not deleted_user:
-            raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
-        return deleted_user
+        deleted_user = await delete_user(session, user_id, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not deleted_user:
+        raise HTTPException(status_code = 404, detail = f"User with ID {user_id} not found.")
+    return deleted_user
 
-@router.delete("/name/{name}", response_model = User)
-def delete_by_name(name: str, session: Session = Depends(get_session), current_user: dict = Depends(require_role("admin"))):
+@router.delete("/name/{name}", response_model = UserRead)
+async def delete_by_name(name: str, session: AsyncSession = Depends(get_async_session), current_user: dict = Depends(require_role("admin"))):
+    # If not admin, users can only delete themselves.
+    owner_name = None if current_user.get("role") == "admin" else current_user.get("name")
     try:
-        user = get_user_by_name(session, name)
-        if not user:
-            raise HTTPException(status_code = 404, detail = f"User with name {name} not found.")
-        # If not admin, can't see users if not an owner.
-        if current_user.get("role") != "admin" and current_user.get("name") != user.name:
-            raise HTTPException(status_code = 403, detail = "Insufficient permissions.")
-        deleted_user = delete_user_by_name(session, name)
-        if not deleted_user:
-            raise HTTPException(status_code = 404, detail = f"User with name '{name}' not found.")
-        return deleted_user
+        deleted_user = await delete_user_by_name(session, name, owner_name)
+    except ValueError as e:
+        raise HTTPException(status_code = 400, detail = str(e))
     except Exception as e:
         raise HTTPException(status_code = 500, detail = f"Unexpected error: {str(e)}")
+    if not deleted_user:
+        raise HTTPException(status_code = 404, detail = f"User with name '{name}' not found.")
+    return deleted_user
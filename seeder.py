@@ -1,25 +1,58 @@
-from sqlmodel import SQLModel, Session
-from db.database import engine, create_db_and_tables, drop_db_and_tables, get_session
+from sqlmodel import SQLModel, Session, select
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+from db.database import engine, create_db_and_tables, drop_db_and_tables
 from models.user import User
 from models.todo_list import Todo_List
 from models.task import Task
 from models.task_status import Task_Status
-from crud.user import get_users
-from datetime import datetime, timezone, timedelta
+import models.report  # Registra las vistas de informes para crearlas y borrarlas con las tablas.
+from crud.report import refresh_report_views
+from datetime import date, datetime, timezone, timedelta
 from dotenv import load_dotenv
 from auth.hashing import hash_password
+import argparse
+import io
+import random
+import time
 
-# Comprueba si puede hacer un get de los usuarios. Si falla,
-# construye la base de datos.
+# Filas que se envían en cada COPY del generador.
+GENERATOR_COPY_CHUNK_ROWS = 50000
+# Estados del generador: las tareas completadas van a "Done" y las abiertas se
+# reparten con estos pesos.
+GENERATOR_DONE_STATUS = ("Done", "Green")
+GENERATOR_OPEN_STATUSES = [(("To do", "Grey"), 0.6), (("In progress", "Yellow"), 0.3), (("Blocked", "Red"), 0.1)]
+GENERATOR_VERBS = ["Buy", "Call", "Email", "Review", "Draft", "Plan", "Fix", "Write", "Prepare", "Update", "Clean", "Book", "Pay", "Renew", "Order", "Schedule"]
+GENERATOR_NOUNS = ["milk", "report", "budget", "invoice", "slides", "meeting", "flight", "rent", "docs", "kitchen", "license", "groceries", "backup", "interview", "contract", "car"]
+# Día al que se refieren las fechas generadas: fijo, para que la misma semilla produzca
+# los mismos datos cualquier día. "--reference-date today" usa la fecha actual.
+GENERATOR_REFERENCE_DATE = date(2025, 1, 1)
+
+# Actualización del esquema sin pérdida de datos: extensiones, tablas, columnas e índices
+# que falten y vistas de informes. Se ejecuta en cada arranque; nunca borra nada.
+def upgrade_schema():
+    load_dotenv()
+    try:
+        create_db_and_tables()
+    except OperationalError as e:
+        print(f"Could not access database, skipping schema upgrade: {str(e.orig).splitlines()[0]}")
+        return False
+    return True
+
+# Siembra la base de datos sólo si todavía no existe la tabla de usuarios. Un error de
+# conexión no debe acabar en drop_all: se avisa y la API arranca sin datos de ejemplo.
 def seed_data_if_missing():
     # Cargar las variables de environment.
     load_dotenv()
-    session = get_session()
     try:
-        return get_users(session)
-    except Exception as e:
-        print("Could not access database. Seeding...")
-        seed_data()
+        if inspect(engine).has_table(User.__table__.name):
+            return False
+    except OperationalError as e:
+        print(f"Could not access database, skipping seeding: {str(e.orig).splitlines()[0]}")
+        return False
+    print("Database is empty. Seeding...")
+    seed_data()
+    return True
 
 def seed_data():
     # Cargar las variables de environment.
@@ -101,5 +134,134 @@ def seed_data():
         except Exception as e:
             print(f"Error creating tasks: {e}")
 
+    # Calcular los informes con los datos recién creados.
+    refresh_report_views()
+
+def _copy_rows(cursor, table: str, columns: list, rows):
+    # COPY en formato texto, por trozos para no acumular millones de filas en memoria.
+    # Los valores generados no contienen tabuladores ni barras invertidas.
+    statement = f'COPY "{table}" ({", ".join(columns)}) FROM STDIN'
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write("\t".join("\\N" if value is None else str(value) for value in row))
+        buffer.write("\n")
+        count += 1
+        if count % GENERATOR_COPY_CHUNK_ROWS == 0:
+            buffer.seek(0)
+            cursor.copy_expert(statement, buffer)
+            buffer = io.StringIO()
+    if buffer.tell():
+        buffer.seek(0)
+        cursor.copy_expert(statement, buffer)
+    return count
+
+def _next_id(cursor, table: str) -> int:
+    cursor.execute(f'SELECT coalesce(max(id), 0) + 1 FROM "{table}"')
+    return cursor.fetchone()[0]
+
+def _status_ids(cursor) -> tuple:
+    # Crea los estados que falten y devuelve (id de "Done", [ids abiertos], [pesos]).
+    ids = {}
+    for name, color in [GENERATOR_DONE_STATUS] + [status for status, _ in GENERATOR_OPEN_STATUSES]:
+        cursor.execute("SELECT id FROM task_status WHERE name = %s ORDER BY id LIMIT 1", (name,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("INSERT INTO task_status (name, color) VALUES (%s, %s) RETURNING id", (name, color))
+            row = cursor.fetchone()
+        ids[name] = row[0]
+    return ids[GENERATOR_DONE_STATUS[0]], [ids[status[0]] for status, _ in GENERATOR_OPEN_STATUSES], [weight for _, weight in GENERATOR_OPEN_STATUSES]
+
+def generate_data(users: int, lists_per_user: int, tasks_per_list: int, seed: int = 42, password: str = "123", append: bool = False, reference_date: date = GENERATOR_REFERENCE_DATE):
+    # Genera N usuarios, M listas por usuario y K tareas por lista. Con la misma semilla
+    # y el mismo día de referencia produce siempre los mismos datos.
+    load_dotenv()
+    if not append:
+        drop_db_and_tables()
+    create_db_and_tables()
+    rng = random.Random(seed)
+    # Un solo hash para todos los usuarios: bcrypt por usuario tardaría horas.
+    hashed_password = hash_password(password)
+    today = datetime.combine(reference_date, datetime.min.time(), tzinfo = timezone.utc)
+    started = time.perf_counter()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        done_status_id, open_status_ids, open_status_weights = _status_ids(cursor)
+        first_user_id = _next_id(cursor, "user")
+        first_list_id = _next_id(cursor, "todo_list")
+        first_task_id = _next_id(cursor, "task")
+
+        def user_rows():
+            for user_id in range(first_user_id, first_user_id + users):
+                role = "viewer" if user_id % 100 == 0 else "user"
+                yield (user_id, f"user_{user_id}", f"user_{user_id}@example.com", role, hashed_password)
+
+        def todo_list_rows():
+            for index in range(users * lists_per_user):
+                owner_id = first_user_id + index // lists_per_user
+                yield (first_list_id + index, f"List {index % lists_per_user + 1} of user_{owner_id}", "", owner_id)
+
+        def task_rows():
+            for index in range(users * lists_per_user * tasks_per_list):
+                # Creación sesgada hacia lo reciente (media de 30 días, hasta un año atrás).
+                created_at = today - timedelta(days = min(rng.expovariate(1 / 30), 365), seconds = rng.randrange(86400))
+                # Plazo de unos días a varias semanas desde la creación.
+                due_date = created_at + timedelta(days = rng.gammavariate(2, 5))
+                # Cuanto más antigua la tarea, más probable que esté completada.
+                age_days = (today - created_at).days
+                is_completed = rng.random() < min(0.95, 0.15 + age_days / 45)
+                status_id = done_status_id if is_completed else rng.choices(open_status_ids, open_status_weights)[0]
+                title = f"{rng.choice(GENERATOR_VERBS)} {rng.choice(GENERATOR_NOUNS)}"
+                description = "" if rng.random() < 0.7 else f"Remember to {title.lower()}."
+                yield (
+                    first_task_id + index,
+                    title,
+                    description,
+                    due_date.isoformat(),
+                    "t" if is_completed else "f",
+                    first_list_id + index // tasks_per_list,
+                    status_id,
+                    created_at.isoformat(),
+                )
+
+        user_count = _copy_rows(cursor, "user", ["id", "name", "email", "role", "hashed_password"], user_rows())
+        list_count = _copy_rows(cursor, "todo_list", ["id", "title", "description", "owner_id"], todo_list_rows())
+        task_count = _copy_rows(cursor, "task", ["id", "title", "description", "due_date", "is_completed", "todo_list_id", "status_id", "created_at"], task_rows())
+        # Los ids se han dado explícitamente: las secuencias deben continuar a partir de ellos.
+        for table in ("user", "todo_list", "task"):
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), (SELECT coalesce(max(id), 1) FROM \"{table}\"))")
+        connection.commit()
+        for table in ("user", "todo_list", "task_status", "task"):
+            cursor.execute(f'ANALYZE "{table}"')
+        connection.commit()
+    finally:
+        connection.close()
+
+    refresh_report_views()
+    print(f"Generated {user_count} users, {list_count} todo lists and {task_count} tasks in {time.perf_counter() - started:.1f}s")
+
+def iso_date(value: str) -> date:
+    return datetime.now(timezone.utc).date() if value == "today" else date.fromisoformat(value)
+
 if __name__ == "__main__":
-    seed_data()
+    parser = argparse.ArgumentParser(description = "Siembra la base de datos.")
+    parser.add_argument("--generate", action = "store_true", help = "Genera datos sintéticos en lugar de los datos de ejemplo.")
+    parser.add_argument("--users", type = int, default = 1000)
+    parser.add_argument("--lists-per-user", type = int, default = 5)
+    parser.add_argument("--tasks-per-list", type = int, default = 20)
+    parser.add_argument("--seed", type = int, default = 42)
+    parser.add_argument("--password", default = "123", help = "Contraseña de todos los usuarios generados.")
+    parser.add_argument("--append", action = "store_true", help = "Añade los datos sin borrar las tablas.")
+    parser.add_argument(
+        "--reference-date",
+        type = iso_date,
+        default = GENERATOR_REFERENCE_DATE,
+        help = f"Día (AAAA-MM-DD) al que se refieren created_at y due_date; por defecto {GENERATOR_REFERENCE_DATE.isoformat()}, o today.",
+    )
+    args = parser.parse_args()
+    if args.generate:
+        generate_data(args.users, args.lists_per_user, args.tasks_per_list, args.seed, args.password, args.append, args.reference_date)
+    else:
+        seed_data()